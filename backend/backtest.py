@@ -0,0 +1,84 @@
+import numpy as np
+
+from portfolio_risk import bucket_exposures
+from projections import ASSET_CLASS_ASSUMPTIONS, DEFAULT_ASSUMPTION
+
+
+def monthly_bucket_returns(model, buckets, proxies):
+    """Calendar-month simple returns for each bucket, from a daily ReturnModel.
+
+    A priced bucket is an equal-weighted basket of its proxy instruments; a
+    bucket without price history earns its assumed return, spread evenly over
+    the months. The first and last months of the window are usually partial
+    and are dropped. Returns (month labels, months x buckets array).
+    """
+    months = model.dates.astype('M8[M]')
+    month_starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    instrument_returns = np.expm1(np.add.reduceat(model.returns, month_starts, axis=0))[1:-1]
+    labels = months[month_starts][1:-1]
+
+    priced, members, _, _ = bucket_exposures({bucket: 1 for bucket in buckets}, proxies, model.symbols)
+    returns = np.empty((len(labels), len(buckets)))
+    for column, bucket in enumerate(buckets):
+        if bucket in priced:
+            returns[:, column] = instrument_returns @ members[priced.index(bucket)]
+        else:
+            expected = ASSET_CLASS_ASSUMPTIONS.get(bucket, DEFAULT_ASSUMPTION)[0]
+            returns[:, column] = (1 + expected) ** (1 / 12) - 1
+    return labels, returns
+
+
+def sip_irr(final_values, contribution, months, iterations=50):
+    """Annualized internal rate of return of a monthly SIP, for each final value.
+
+    Contributions go in at the start of every month, so the final value is
+    contribution * sum((1 + i) ** k for k in 1..months); Newton's method on
+    the monthly rate i runs for all scenarios at once.
+    """
+    target = final_values / contribution
+    periods = np.arange(1, months + 1)
+    rate = np.zeros_like(target)
+    for _ in range(iterations):
+        growth = (1 + rate[:, None]) ** periods
+        value = growth.sum(axis=1) - target
+        slope = (periods * growth / (1 + rate[:, None])).sum(axis=1)
+        rate = np.maximum(rate - value / slope, -0.99)
+    return (1 + rate) ** 12 - 1
+
+
+def backtest(monthly_returns, allocations, starts, months, contribution=1.0, rebalance_every=12):
+    """Run a monthly SIP through history for many (allocation, start month) scenarios at once.
+
+    ``allocations`` is (scenarios x buckets) of weights summing to one and
+    ``starts`` the first month index of each scenario. Every month the
+    contribution is invested at the target weights and holdings grow by that
+    month's bucket returns; every ``rebalance_every`` months (0 for never)
+    holdings are reset to the target weights. The loop is over months only;
+    each step is one (scenarios x buckets) array operation.
+    """
+    allocations = np.asarray(allocations, dtype=np.float64)
+    starts = np.asarray(starts)
+    if starts.min() < 0 or starts.max() + months > len(monthly_returns):
+        raise ValueError("Backtest window runs past the available price history")
+    holdings = np.zeros_like(allocations)
+    values = np.empty((len(allocations), months))
+    period_returns = np.empty((len(allocations), months))
+    for month in range(months):
+        invested = holdings.sum(axis=1) + contribution
+        holdings = (holdings + contribution * allocations) * (1 + monthly_returns[starts + month])
+        values[:, month] = holdings.sum(axis=1)
+        period_returns[:, month] = values[:, month] / invested - 1
+        if rebalance_every and (month + 1) % rebalance_every == 0:
+            holdings = values[:, month, None] * allocations
+
+    # Time-weighted growth strips out the contributions, for CAGR and drawdown
+    growth = np.cumprod(1 + period_returns, axis=1)
+    drawdown = growth / np.maximum.accumulate(growth, axis=1) - 1
+    return {
+        'values': values,
+        'returns': period_returns,
+        'cagr': growth[:, -1] ** (12 / months) - 1,
+        'sip_irr': sip_irr(values[:, -1], contribution, months),
+        'max_drawdown': drawdown.min(axis=1),
+        'contributed': contribution * months,
+    }
@@ -0,0 +1,60 @@
+"""Time a 1000+ scenario SIP backtest sweep and check it against a plain loop.
+
+Uses 25 years of synthetic monthly bucket returns, so it runs without any
+ingested prices. Run from the backend directory: python bench_backtest.py
+"""
+import time
+
+import numpy as np
+
+from backtest import backtest
+from efficient_frontier import FRONTIER_BUCKETS
+from projections import monthly_return_model
+
+HISTORY_MONTHS = 25 * 12
+WINDOW_MONTHS = 10 * 12
+ALLOCATIONS = 6
+
+
+def synthetic_history(seed=11):
+    monthly_mean, cholesky = monthly_return_model(list(FRONTIER_BUCKETS))
+    shocks = np.random.default_rng(seed).standard_normal((HISTORY_MONTHS, len(FRONTIER_BUCKETS))) @ cholesky.T
+    return np.expm1(monthly_mean + shocks)
+
+
+def loop_backtest(monthly_returns, allocation, start, months, contribution, rebalance_every):
+    holdings = [0.0] * len(allocation)
+    value = 0.0
+    for month in range(months):
+        returns = monthly_returns[start + month]
+        holdings = [(held + contribution * weight) * (1 + ret) for held, weight, ret in zip(holdings, allocation, returns)]
+        value = sum(holdings)
+        if rebalance_every and (month + 1) % rebalance_every == 0:
+            holdings = [value * weight for weight in allocation]
+    return value
+
+
+def main():
+    monthly_returns = synthetic_history()
+    rng = np.random.default_rng(3)
+    allocations = rng.dirichlet(np.ones(len(FRONTIER_BUCKETS)), ALLOCATIONS)
+    starts = np.arange(HISTORY_MONTHS - WINDOW_MONTHS + 1)
+    scenario_weights = np.repeat(allocations, len(starts), axis=0)
+    scenario_starts = np.tile(starts, ALLOCATIONS)
+
+    began = time.perf_counter()
+    result = backtest(monthly_returns, scenario_weights, scenario_starts, WINDOW_MONTHS, 10000, 12)
+    elapsed = time.perf_counter() - began
+    print(f"{len(scenario_starts)} scenarios x {WINDOW_MONTHS} months: {elapsed * 1000:.1f} ms")
+
+    checks = rng.choice(len(scenario_starts), 20, replace=False)
+    worst = max(
+        abs(loop_backtest(monthly_returns, scenario_weights[row], scenario_starts[row], WINDOW_MONTHS, 10000, 12) - result['values'][row, -1])
+        / result['values'][row, -1]
+        for row in checks
+    )
+    print(f"max relative difference vs loop on {len(checks)} scenarios: {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main()
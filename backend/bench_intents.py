@@ -0,0 +1,72 @@
+"""Per-message cost of the compiled intent matcher vs the old keyword chain.
+
+Run from the backend directory: python bench_intents.py
+"""
+import random
+import string
+import timeit
+
+from intents import IntentMatcher
+
+MESSAGES = [
+    "How much emergency fund should I keep?",
+    "What should I invest in?",
+    "Should I start SIP?",
+    "Which mutual funds are good?",
+    "How to save taxes?",
+    "Should I invest in stocks?",
+    "How to plan for retirement?",
+    "I earn 80k a month and spend about 45k, my parents depend on me and I have no idea where to begin",
+]
+
+# The chain generate_financial_advice used before the matcher, in the same order
+LEGACY_CHAIN = [
+    ('emergency_fund', ['emergency', 'emergency fund']),
+    ('sip', ['sip', 'systematic', 'monthly']),
+    ('tax_saving', ['tax', 'save', '80c', 'elss']),
+    ('retirement', ['retirement', 'pension', 'retire']),
+    ('stocks', ['stock', 'share', 'equity', 'nse', 'bse']),
+    ('mutual_funds', ['mutual fund', 'fund', 'mf']),
+    ('risk_profile', ['risk', 'safe', 'conservative', 'aggressive']),
+    ('investment', ['invest', 'investment', 'money', 'portfolio', 'asset']),
+]
+
+
+def legacy_classify(message, chain=LEGACY_CHAIN):
+    message_lower = message.lower()
+    for name, words in chain:
+        if any(word in message_lower for word in words):
+            return name
+    return 'general'
+
+
+def synthetic_intents(count, keywords_per_intent=5, seed=7):
+    rng = random.Random(seed)
+    intents = []
+    for index in range(count):
+        keywords = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(keywords_per_intent)]
+        intents.append({'name': f'intent_{index}', 'priority': rng.randint(0, 100), 'keywords': keywords})
+    return intents
+
+
+def per_message_us(classify, messages, repeat=5, number=2000):
+    best = min(timeit.repeat(lambda: [classify(message) for message in messages], repeat=repeat, number=number))
+    return best / (number * len(messages)) * 1e6
+
+
+def main():
+    matcher = IntentMatcher.from_file()
+    print(f"{'intents':>8} {'legacy chain':>14} {'compiled':>10}")
+    print(f"{len(LEGACY_CHAIN):>8} {per_message_us(legacy_classify, MESSAGES):>11.2f} us {per_message_us(matcher.classify, MESSAGES):>7.2f} us")
+
+    for count in (100, 500):
+        intents = synthetic_intents(count) + [{**intent, 'priority': 1000} for intent in matcher.intents.values()]
+        chain = [(intent['name'], intent['keywords']) for intent in intents]
+        big_matcher = IntentMatcher(intents)
+        legacy = per_message_us(lambda message: legacy_classify(message, chain), MESSAGES, number=200)
+        compiled = per_message_us(big_matcher.classify, MESSAGES, number=200)
+        print(f"{len(intents):>8} {legacy:>11.2f} us {compiled:>7.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Latency of the portfolio read: two find_one calls vs one aggregation.
+
+Needs a running Mongo. Seeds a scratch database (dropped afterwards) with
+users that each have one current recommendation carrying a history of
+earlier ones (as RecommendationStore keeps them) and several risk
+assessments, creates the production indexes, then times both read paths on
+random users.
+
+Run from the backend directory: python bench_portfolio_reads.py [users]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db_indexes import ensure_indexes
+from portfolio_queries import load_portfolio_state
+
+HISTORY_PER_USER = 5
+READS = 2000
+
+
+async def seed(db, users):
+    now = datetime.now()
+    profiles, recommendations, assessments = [], [], []
+    for index in range(users):
+        user_id = f"user-{index}"
+        profiles.append({'user_id': user_id, 'age': 30, 'monthly_income': 100000, 'monthly_expenses': 60000})
+        history = []
+        for version in reversed(range(HISTORY_PER_USER)):
+            timestamp = now - timedelta(days=version)
+            history.append({'allocation': {'debt_funds': 100}, 'risk_category': 'Moderate Risk', 'profile_hash': str(version), 'timestamp': timestamp})
+            assessments.append({'user_id': user_id, 'risk_category': 'Moderate Risk', 'risk_score': 50.0, 'timestamp': timestamp})
+        recommendations.append({'user_id': user_id, 'allocation': {'debt_funds': 100}, 'recommendations': [], 'timestamp': now, 'history': history})
+    await db.user_profiles.insert_many(profiles, ordered=False)
+    await db.investment_recommendations.insert_many(recommendations, ordered=False)
+    await db.risk_assessments.insert_many(assessments, ordered=False)
+    await ensure_indexes(db, 90)
+
+
+async def two_find_ones(db, user_id):
+    profile = await db.user_profiles.find_one({"user_id": user_id})
+    recommendation = await db.investment_recommendations.find_one({"user_id": user_id}, sort=[("timestamp", -1)])
+    return profile, recommendation
+
+
+async def time_reads(read, db, user_ids):
+    began = time.perf_counter()
+    for user_id in user_ids:
+        await read(db, user_id)
+    return (time.perf_counter() - began) / len(user_ids) * 1000
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client.bench_portfolio_reads
+    await client.drop_database(db.name)
+    try:
+        await seed(db, users)
+        user_ids = [f"user-{random.randrange(users)}" for _ in range(READS)]
+        await time_reads(load_portfolio_state, db, user_ids[:100])  # warm up
+        print(f"{users} users, {READS} reads")
+        print(f"two find_one calls: {await time_reads(two_find_ones, db, user_ids):.3f} ms/read")
+        print(f"one aggregation:    {await time_reads(load_portfolio_state, db, user_ids):.3f} ms/read")
+    finally:
+        await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""Check the batch risk scorer against assess_risk and time both.
+
+Run from the backend directory: python bench_risk_scoring.py
+"""
+import asyncio
+import random
+import time
+
+import server
+from risk_scoring import assessment_dicts
+from server import UserProfile
+
+
+class DiscardingCollection:
+    async def insert_one(self, document):
+        pass
+
+    async def update_one(self, filter, update, upsert=False):
+        pass
+
+
+def random_profiles(count, seed=11):
+    rng = random.Random(seed)
+    profiles = []
+    for index in range(count):
+        income = rng.choice([0, 25000, rng.uniform(0, 300000)])
+        profiles.append(UserProfile(
+            user_id=str(index),
+            name=f"User {index}",
+            age=rng.randint(18, 80),
+            monthly_income=income,
+            # Include values sitting exactly on the band edges
+            monthly_expenses=rng.choice([0, income * 0.5, income * 0.7, income * 0.9, rng.uniform(0, 200000)]),
+            current_savings=0,
+            dependents=rng.randint(0, 4),
+            financial_goals=[],
+            investment_experience=rng.choice(['beginner', 'Intermediate', 'EXPERIENCED', 'unknown']),
+            risk_preference='moderate',
+            investment_horizon=rng.choice(['short', 'Medium', 'long', '']),
+            emergency_fund=rng.choice([0, income, income * 3, income * 6, rng.uniform(0, 2000000)])
+        ))
+    return profiles
+
+
+async def single_profile_results(profiles):
+    server.db = type('DiscardingDatabase', (), {'risk_assessments': DiscardingCollection()})()
+    server.dashboards.collection = DiscardingCollection()
+    return [await server.assess_risk(profile) for profile in profiles]
+
+
+def main(count=50000):
+    profiles = random_profiles(count)
+
+    started = time.perf_counter()
+    expected = asyncio.run(single_profile_results(profiles))
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = assessment_dicts(profiles)
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for one, other in zip(expected, actual) if one != other)
+    print(f"{count} profiles: assess_risk {single_seconds * 1000:.0f} ms, batch {batch_seconds * 1000:.0f} ms, {mismatches} mismatches")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
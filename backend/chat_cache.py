@@ -0,0 +1,116 @@
+import bisect
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# Band edges for bucketing user context; the age edges match assess_risk
+AGE_BAND_EDGES = [25, 35, 45, 55]
+INCOME_BAND_EDGES = [25000, 50000, 100000, 200000]
+
+
+def normalize_message(message):
+    """Lowercase, drop punctuation and collapse whitespace so trivially different phrasings share a key"""
+    return ' '.join(re.sub(r'[^a-z0-9₹%]+', ' ', message.lower()).split())
+
+
+def band(value, edges):
+    try:
+        return bisect.bisect_right(edges, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def chat_cache_key(message, age, income, risk_category):
+    """Return (key, normalized message, banded context) for a chat question"""
+    context = {
+        'age_band': band(age, AGE_BAND_EDGES),
+        'income_band': band(income, INCOME_BAND_EDGES),
+        'risk_category': str(risk_category).lower()
+    }
+    text = normalize_message(message)
+    raw = f"{text}|{context['age_band']}|{context['income_band']}|{context['risk_category']}"
+    return hashlib.sha256(raw.encode()).hexdigest(), text, context
+
+
+class ChatResponseCache:
+    """Two-tier cache of chat answers: an in-memory LRU in front of a Mongo collection.
+
+    Mongo expires entries through a TTL index on ``created_at``; since the TTL
+    monitor only runs about once a minute, reads check the age themselves too.
+    Storage errors are counted and treated as misses so chat never fails on them.
+    """
+
+    def __init__(self, collection, ttl, max_size=1024):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (response, stored_at)
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def ensure_indexes(self):
+        await self.collection.create_index('created_at', expireAfterSeconds=int(self.ttl))
+
+    def _remember(self, key, response, stored_at):
+        self._entries[key] = (response, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.time() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+            del self._entries[key]
+
+        try:
+            document = await self.collection.find_one({
+                '_id': key,
+                'created_at': {'$gt': datetime.utcnow() - timedelta(seconds=self.ttl)}
+            })
+        except Exception as cache_error:
+            print(f"Chat cache read failed: {cache_error!r}")
+            self.errors += 1
+            document = None
+
+        if document is None:
+            self.misses += 1
+            return None
+        self.mongo_hits += 1
+        # Keep the original store time so the memory copy expires with the Mongo one
+        stored_at = time.time() - (datetime.utcnow() - document['created_at']).total_seconds()
+        self._remember(key, document['response'], stored_at)
+        return document['response']
+
+    async def set(self, key, response, message, context):
+        self._remember(key, response, time.time())
+        try:
+            await self.collection.replace_one(
+                {'_id': key},
+                {'response': response, 'message': message, 'context': context, 'created_at': datetime.utcnow()},
+                upsert=True
+            )
+        except Exception as cache_error:
+            print(f"Chat cache write failed: {cache_error!r}")
+            self.errors += 1
+
+    def stats(self):
+        lookups = self.memory_hits + self.mongo_hits + self.misses
+        hits = self.memory_hits + self.mongo_hits
+        return {
+            'memory_hits': self.memory_hits,
+            'mongo_hits': self.mongo_hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_ratio': round(hits / lookups, 3) if lookups else None,
+            'memory_entries': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl
+        }
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+
+class DashboardStore:
+    """Materialized per-user dashboard: profile, latest risk, latest recommendation and projections.
+
+    One document per user, keyed by user_id as ``_id`` so a read is a single
+    primary-key lookup. Each write path ``$set``s only the section it owns,
+    so concurrent writers to different sections don't overwrite each other.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def _set(self, user_id, fields):
+        await self.collection.update_one(
+            {'_id': user_id},
+            {'$set': {**fields, 'user_id': user_id, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def set_profile(self, profile):
+        await self._set(profile['user_id'], {'profile': without_id(profile)})
+
+    async def set_risk_assessment(self, assessment):
+        await self._set(assessment['user_id'], {'risk_assessment': without_id(assessment)})
+
+    async def set_risk_assessments(self, assessments):
+        """Batch version of set_risk_assessment: one unordered bulk write"""
+        if not assessments:
+            return
+        now = datetime.utcnow()
+        await self.collection.bulk_write([
+            UpdateOne(
+                {'_id': assessment['user_id']},
+                {'$set': {'risk_assessment': without_id(assessment), 'user_id': assessment['user_id'], 'updated_at': now}},
+                upsert=True
+            )
+            for assessment in assessments
+        ], ordered=False)
+
+    async def set_recommendation(self, recommendation, projections):
+        await self._set(recommendation['user_id'], {'recommendation': without_id(recommendation), 'projections': projections})
+
+    async def replace(self, user_id, dashboard):
+        """Store a dashboard rebuilt from the source collections"""
+        await self.collection.replace_one(
+            {'_id': user_id},
+            {**dashboard, 'user_id': user_id, 'updated_at': datetime.utcnow()},
+            upsert=True
+        )
+
+    async def get(self, user_id):
+        dashboard = await self.collection.find_one({'_id': user_id})
+        if dashboard is not None:
+            dashboard.pop('_id')
+        return dashboard
+
+
+def without_id(document):
+    return {key: value for key, value in document.items() if key != '_id'}
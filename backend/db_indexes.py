@@ -0,0 +1,125 @@
+"""Mongo indexes for the per-user collections, and an explain-based coverage check.
+
+Run from the backend directory to create the indexes and print the plan of
+every hot query: python db_indexes.py
+"""
+import asyncio
+import os
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# Collection -> indexes every deployment needs
+INDEXES = {
+    'user_profiles': [
+        IndexModel([('user_id', ASCENDING)], name='user_id_unique', unique=True),
+    ],
+    'risk_assessments': [
+        IndexModel([('user_id', ASCENDING), ('timestamp', DESCENDING)], name='user_id_timestamp'),
+    ],
+    'investment_recommendations': [
+        IndexModel([('user_id', ASCENDING), ('timestamp', DESCENDING)], name='user_id_timestamp'),
+        # One current recommendation per user, so concurrent first-time upserts can't both insert.
+        # Partial: documents without a user_id are left out rather than all colliding on null.
+        IndexModel(
+            [('user_id', ASCENDING)],
+            name='user_id_unique',
+            unique=True,
+            partialFilterExpression={'user_id': {'$type': 'string'}}
+        ),
+    ],
+}
+
+# How to clear the duplicates that stop a unique index from building
+DUPLICATE_FIXES = {
+    'investment_recommendations': 'python migrate_recommendations.py --apply',
+}
+
+
+class IndexCoverageError(RuntimeError):
+    pass
+
+
+class IndexCreationError(RuntimeError):
+    """Indexes Mongo refused to build (e.g. duplicates under a unique index), per collection"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__("Could not create indexes: " + "; ".join(
+            f"{collection}: {failure}" + (
+                f" (to fix, run: {DUPLICATE_FIXES[collection]})"
+                if getattr(failure, 'code', None) == 11000 and collection in DUPLICATE_FIXES else ''
+            )
+            for collection, failure in failures.items()
+        ))
+
+
+def chat_history_indexes(retention_days):
+    return [IndexModel([('timestamp', ASCENDING)], name='timestamp_ttl', expireAfterSeconds=int(retention_days * 24 * 60 * 60))]
+
+
+async def ensure_indexes(db, chat_history_retention_days):
+    """Create any missing indexes; creating ones that already exist is a no-op.
+
+    Every collection is attempted; the ones Mongo refuses are reported
+    together in a single IndexCreationError. Nothing here ever changes
+    documents: duplicates under a unique index are left for a migration.
+    """
+    indexes = {**INDEXES, 'chat_history': chat_history_indexes(chat_history_retention_days)}
+    failures = {}
+    for collection, models in indexes.items():
+        # One bad collection or index mustn't leave the others unbuilt
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as index_error:
+                failures.setdefault(collection, index_error)
+    if failures:
+        raise IndexCreationError(failures)
+
+
+def plan_stages(plan):
+    """Every stage name in an explain plan tree"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+
+async def query_plans(db):
+    """Winning-plan stages of each hot query, as {collection: [stages]}"""
+    plans = {}
+    for collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        plans[collection] = list(plan_stages(explain['queryPlanner']['winningPlan']))
+    return plans
+
+
+async def check_query_plans(db):
+    """Raise IndexCoverageError if any hot query's winning plan scans the whole collection"""
+    plans = await query_plans(db)
+    scans = {collection: stages for collection, stages in plans.items() if 'COLLSCAN' in stages}
+    if scans:
+        raise IndexCoverageError(f"Hot queries fall back to COLLSCAN: {scans}")
+    return plans
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    db = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017')).financial_advisor
+    await ensure_indexes(db, float(os.environ.get('CHAT_HISTORY_RETENTION_DAYS', 90)))
+    for collection, stages in (await query_plans(db)).items():
+        print(f"{collection}: {' <- '.join(stages)}")
+    await check_query_plans(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
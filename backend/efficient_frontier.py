@@ -0,0 +1,141 @@
+import numpy as np
+
+from projections import ASSET_CLASS_ASSUMPTIONS, DEFAULT_ASSUMPTION, correlation_matrix
+from risk_scoring import AGE_SCORES, CATEGORIES, CATEGORY_EDGES, EMERGENCY_SCORES, EXPERIENCE_SCORES, HORIZON_SCORES, INCOME_RATIO_SCORES
+
+FRONTIER_BUCKETS = tuple(ASSET_CLASS_ASSUMPTIONS)
+MAX_RISK_SCORE = int(AGE_SCORES.max() + INCOME_RATIO_SCORES.max() + max(EXPERIENCE_SCORES.values()) + max(HORIZON_SCORES.values()) + EMERGENCY_SCORES.max())
+
+# Weight bounds (fractions) per bucket for each risk category; unlisted buckets are held at zero
+CATEGORY_BOUNDS = {
+    'High Risk': {
+        'equity_large_cap': (0.20, 0.45),
+        'equity_mid_cap': (0.10, 0.30),
+        'equity_small_cap': (0.05, 0.20),
+        'mutual_funds_equity': (0.10, 0.30),
+        'debt_funds': (0.05, 0.20),
+        'emergency_buffer': (0.05, 0.05),
+    },
+    'Moderate Risk': {
+        'equity_large_cap': (0.20, 0.40),
+        'equity_mid_cap': (0.05, 0.20),
+        'equity_small_cap': (0.00, 0.05),
+        'mutual_funds_equity': (0.15, 0.30),
+        'debt_funds': (0.15, 0.35),
+        'emergency_buffer': (0.10, 0.10),
+    },
+    'Low Risk': {
+        'equity_large_cap': (0.10, 0.25),
+        'mutual_funds_equity': (0.10, 0.20),
+        'debt_funds': (0.40, 0.60),
+        'emergency_buffer': (0.20, 0.20),
+    },
+}
+
+
+def category_score_ranges():
+    """Inclusive (lowest, highest) questionnaire score for each risk category"""
+    edges = [0, *CATEGORY_EDGES.tolist(), MAX_RISK_SCORE + 1]
+    return {category: (edges[i], edges[i + 1] - 1) for i, category in enumerate(CATEGORIES.tolist())}
+
+
+def bucket_moments(buckets, historical_covariance=None, historical_buckets=()):
+    """Annual expected returns and covariance for the buckets.
+
+    Expected returns always come from the long-run assumptions, since a few
+    years of prices say little about means. Volatilities and correlations of
+    the buckets in ``historical_buckets`` come from ``historical_covariance``
+    (annualized, in that order) where given, and from the assumptions otherwise.
+    """
+    annual = np.array([ASSET_CLASS_ASSUMPTIONS.get(bucket, DEFAULT_ASSUMPTION) for bucket in buckets])
+    expected, volatility = annual[:, 0], annual[:, 1].copy()
+    correlation = correlation_matrix(list(buckets))
+    if historical_covariance is not None and len(historical_buckets):
+        rows = np.array([buckets.index(bucket) for bucket in historical_buckets])
+        historical_volatility = np.sqrt(np.diag(historical_covariance))
+        volatility[rows] = historical_volatility
+        correlation[np.ix_(rows, rows)] = historical_covariance / np.outer(historical_volatility, historical_volatility)
+    covariance = np.outer(volatility, volatility) * correlation
+    # Splicing two correlation sources can leave tiny negative eigenvalues
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    covariance = (eigenvectors * np.clip(eigenvalues, 1e-10, None)) @ eigenvectors.T
+    return expected, covariance
+
+
+def project_to_bounds(points, lower, upper, iterations=40):
+    """Euclidean projection of each row onto {w : sum(w) = 1, lower <= w <= upper}.
+
+    The projection is clip(v - tau, lower, upper) for the shift tau that makes
+    the row sum to one; tau is found by bisection for all rows at once.
+    """
+    low = (points - upper).min(axis=1, keepdims=True)
+    high = (points - lower).max(axis=1, keepdims=True)
+    for _ in range(iterations):
+        tau = (low + high) / 2
+        too_big = np.clip(points - tau, lower, upper).sum(axis=1, keepdims=True) > 1
+        low = np.where(too_big, tau, low)
+        high = np.where(too_big, high, tau)
+    return np.clip(points - (low + high) / 2, lower, upper)
+
+
+def solve_frontier(expected, covariance, lower, upper, points=40, iterations=4000, tolerance=1e-10):
+    """Long-only, bounded mean-variance frontier.
+
+    Maximizes expected'w - gamma * w'Cw for a log-spaced sweep of risk
+    aversions gamma, all solved together by accelerated projected gradient.
+    Returns (weights, expected returns, volatilities) ordered by volatility.
+    """
+    if lower.sum() > 1 + 1e-9 or upper.sum() < 1 - 1e-9:
+        raise ValueError("Bucket bounds admit no fully invested portfolio")
+    gammas = np.logspace(-1, 4, points)[:, None]
+    step = 1 / (2 * gammas * np.linalg.eigvalsh(covariance)[-1])
+    weights = project_to_bounds(np.tile((lower + upper) / 2, (points, 1)), lower, upper)
+    momentum, previous, t = weights, weights, 1.0
+    for _ in range(iterations):
+        gradient = expected - 2 * gammas * (momentum @ covariance)
+        weights = project_to_bounds(momentum + step * gradient, lower, upper)
+        if np.abs(weights - previous).max() < tolerance:
+            break
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = weights + (t - 1) / t_next * (weights - previous)
+        previous, t = weights, t_next
+
+    returns = weights @ expected
+    volatility = np.sqrt(np.einsum('ij,jk,ik->i', weights, covariance, weights))
+    order = np.argsort(volatility)
+    return weights[order], returns[order], volatility[order]
+
+
+def percent_allocation(buckets, weights):
+    """Whole-percent allocation summing to 100 (largest remainders round up), zero buckets dropped"""
+    percent = weights * 100
+    whole = np.floor(percent + 1e-9).astype(int)
+    shortfall = 100 - whole.sum()
+    whole[np.argsort(-(percent - whole), kind='stable')[:shortfall]] += 1
+    return {bucket: int(value) for bucket, value in zip(buckets, whole) if value > 0}
+
+
+def build_frontiers(expected, covariance, buckets=FRONTIER_BUCKETS, points=40):
+    """Frontier per risk category, and the allocation to use for every questionnaire score.
+
+    Within a category, scores map linearly onto target volatility between the
+    category's minimum-variance and maximum-return portfolios, and each score
+    takes the frontier portfolio closest to its target.
+    """
+    frontiers, allocations = {}, {}
+    for category, (lowest, highest) in category_score_ranges().items():
+        bounds = CATEGORY_BOUNDS[category]
+        lower = np.array([bounds.get(bucket, (0.0, 0.0))[0] for bucket in buckets])
+        upper = np.array([bounds.get(bucket, (0.0, 0.0))[1] for bucket in buckets])
+        weights, returns, volatility = solve_frontier(expected, covariance, lower, upper, points)
+        frontiers[category] = [
+            {'expected_return': round(float(ret), 6), 'volatility': round(float(vol), 6), 'allocation': percent_allocation(buckets, row)}
+            for row, ret, vol in zip(weights, returns, volatility)
+        ]
+        scores = np.arange(lowest, highest + 1)
+        position = (scores - lowest) / max(highest - lowest, 1)
+        targets = volatility[0] + position * (volatility[-1] - volatility[0])
+        nearest = np.abs(volatility[None, :] - targets[:, None]).argmin(axis=1)
+        for score, point in zip(scores.tolist(), nearest.tolist()):
+            allocations[str(score)] = frontiers[category][point]['allocation']
+    return frontiers, allocations
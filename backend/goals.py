@@ -0,0 +1,75 @@
+import numpy as np
+
+# Annual portfolio return assumed for each risk category, per scenario
+RETURN_BANDS = {
+    'Low Risk': {'pessimistic': 0.06, 'expected': 0.08, 'optimistic': 0.10},
+    'Moderate Risk': {'pessimistic': 0.07, 'expected': 0.10, 'optimistic': 0.13},
+    'High Risk': {'pessimistic': 0.08, 'expected': 0.12, 'optimistic': 0.16},
+}
+SCENARIOS = ('pessimistic', 'expected', 'optimistic')
+
+
+def required_sip(targets, corpus, months, annual_returns):
+    """Monthly SIP (invested at the start of each month) that grows to each target.
+
+    Closed-form inverse of the annuity-due future value
+        FV = sip * ((1 + i) ** n - 1) / i * (1 + i),  i = (1 + r) ** (1 / 12) - 1,
+    after crediting the growth of the corpus already saved. ``targets``,
+    ``corpus`` and ``months`` are per goal; ``annual_returns`` per scenario.
+    Returns a (scenarios x goals) array.
+    """
+    rate = ((1 + np.asarray(annual_returns, dtype=np.float64)) ** (1 / 12) - 1)[:, None]
+    months = np.asarray(months, dtype=np.float64)[None, :]
+    growth = (1 + rate) ** months
+    remaining = np.maximum(np.asarray(targets, dtype=np.float64) - np.asarray(corpus, dtype=np.float64) * growth, 0.0)
+    # At a zero rate the annuity factor tends to n
+    safe_rate = np.where(rate == 0, 1.0, rate)
+    annuity = np.where(rate == 0, months, (growth - 1) / safe_rate * (1 + rate))
+    return remaining / annuity
+
+
+def plan_goals(goals, months, risk_category, monthly_budget=None, inflation=0.06):
+    """SIP plan for every goal under each return scenario of the risk category.
+
+    ``goals`` are dicts with target_amount (today's rupees), priority (1 is
+    most important) and current_savings; ``months`` is months to each goal.
+    Targets are inflated to the goal date. With a budget, goals are funded
+    greedily in priority order (then by date): each is marked funded if its
+    SIP fits in what the goals funded before it left over, so a goal that
+    doesn't fit is skipped rather than blocking the ones after it.
+    """
+    bands = RETURN_BANDS.get(risk_category, RETURN_BANDS['Moderate Risk'])
+    months = np.asarray(months, dtype=np.float64)
+    targets = np.array([goal['target_amount'] for goal in goals], dtype=np.float64) * (1 + inflation) ** (months / 12)
+    corpus = np.array([goal.get('current_savings', 0) for goal in goals], dtype=np.float64)
+    sip = required_sip(targets, corpus, months, [bands[scenario] for scenario in SCENARIOS])
+
+    order = np.lexsort((months, [goal.get('priority', 1) for goal in goals]))
+    funded = np.ones_like(sip, dtype=bool)
+    if monthly_budget is not None:
+        remaining = np.full(len(SCENARIOS), float(monthly_budget))
+        for column in order:
+            funded[:, column] = sip[:, column] <= remaining + 1e-9
+            remaining -= np.where(funded[:, column], sip[:, column], 0.0)
+
+    plan = [
+        {
+            'name': goal['name'],
+            'priority': goal.get('priority', 1),
+            'months': int(months[column]),
+            'target_at_goal_date': round(float(targets[column]), 2),
+            'monthly_sip': {scenario: round(float(sip[row, column]), 2) for row, scenario in enumerate(SCENARIOS)},
+            'funded': {scenario: bool(funded[row, column]) for row, scenario in enumerate(SCENARIOS)},
+        }
+        for column, goal in enumerate(goals)
+    ]
+    totals = sip.sum(axis=1)
+    summary = {
+        scenario: {
+            'annual_return': bands[scenario],
+            'total_monthly_sip': round(float(totals[row]), 2),
+            'shortfall': None if monthly_budget is None else round(max(float(totals[row]) - monthly_budget, 0.0), 2),
+        }
+        for row, scenario in enumerate(SCENARIOS)
+    }
+    return plan, summary
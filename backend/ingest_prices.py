@@ -0,0 +1,30 @@
+"""Load daily price CSVs into the local price store, e.g. for offline use.
+
+Each file is named <SYMBOL>.csv (RELIANCE.BSE.csv) with date (or timestamp),
+open, high, low, close and volume columns, as Alpha Vantage's datatype=csv
+export produces. Only days after the last stored day are appended.
+
+Usage: python ingest_prices.py CSV_DIR [--store PRICE_STORE_DIR]
+"""
+import argparse
+import os
+
+from price_store import PriceStore, ingest_csv_dir
+
+DEFAULT_STORE_DIR = os.environ.get('PRICE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prices'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv_dir')
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+
+    store = PriceStore(args.store)
+    for symbol, appended in ingest_csv_dir(store, args.csv_dir).items():
+        info = store.info(symbol)
+        print(f"{symbol}: +{appended} rows, {info['rows']} total ({info['first_date']} to {info['last_date']})")
+
+
+if __name__ == "__main__":
+    main()
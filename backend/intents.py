@@ -0,0 +1,76 @@
+import json
+import os
+import re
+from collections import defaultdict
+
+INTENTS_PATH = os.path.join(os.path.dirname(__file__), 'intents.json')
+
+
+def trie_pattern(keywords):
+    """Build a regex alternation factored into a prefix trie.
+
+    A flat ``a|b|c`` alternation retries every keyword at every position; the
+    trie form only follows branches that still match, so the cost of a scan
+    grows with keyword length rather than with the number of keywords.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A keyword ends here; the greedy optional prefers a longer one that continues
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+
+class IntentMatcher:
+    """Classify a chat message into one intent with a single regex pass.
+
+    Every keyword of every intent is compiled into one trie-shaped pattern that
+    matches at word starts (so "fund" also hits "funds", but "sip" does not hit
+    "gossip"). All intents hit by the message are collected, and the one with
+    the highest priority wins; ties go to the intent listed first.
+    """
+
+    def __init__(self, intents):
+        self.intents = {intent['name']: intent for intent in intents}
+        self._rank = {
+            intent['name']: (-intent.get('priority', 0), order)
+            for order, intent in enumerate(intents)
+        }
+        self._keyword_intents = defaultdict(set)
+        for intent in intents:
+            for keyword in intent['keywords']:
+                self._keyword_intents[' '.join(keyword.lower().split())].add(intent['name'])
+        self._pattern = re.compile(r'\b' + trie_pattern(self._keyword_intents))
+
+    @classmethod
+    def from_file(cls, path=INTENTS_PATH):
+        with open(path) as intents_file:
+            return cls(json.load(intents_file))
+
+    def matches(self, message):
+        """All intents with at least one keyword in the message"""
+        hits = set()
+        for match in self._pattern.finditer(message.lower()):
+            hits |= self._keyword_intents[' '.join(match.group().split())]
+        return hits
+
+    def classify(self, message, default='general'):
+        hits = self.matches(message)
+        if not hits:
+            return default
+        return min(hits, key=self._rank.__getitem__)
@@ -0,0 +1,183 @@
+import asyncio
+import time
+
+import openai
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class LLMBusy(Exception):
+    """No local concurrency slot freed up in time; says nothing about the upstream"""
+
+
+class CircuitBreaker:
+    """Stop calling a failing upstream until it has had time to recover.
+
+    closed: calls go through, consecutive failures are counted.
+    open: calls are refused immediately until ``reset_timeout`` has passed.
+    half_open: one trial call is let through; success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.last_error = None
+
+    def allow(self):
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = 'half_open'
+        if self.state == 'closed':
+            return True
+        if self.state == 'half_open' and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def cancel_trial(self):
+        self.trial_in_flight = False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self, error, trip=False):
+        self.failures += 1
+        self.trial_in_flight = False
+        self.last_error = f"{type(error).__name__}: {error}"
+        if trip or self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+    def status(self):
+        status = {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'last_error': self.last_error
+        }
+        if self.state == 'open':
+            status['retry_in_seconds'] = round(max(0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+        return status
+
+
+class LLMClient:
+    """Async chat-completion calls with a hard deadline, a concurrency cap and a circuit breaker"""
+
+    # Errors that won't fix themselves on the next call (bad key, quota exhausted)
+    TRIPPING_ERRORS = (openai.error.AuthenticationError, openai.error.PermissionError, openai.error.RateLimitError)
+
+    def __init__(self, model, timeout, max_concurrency, breaker):
+        self.model = model
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker
+        self.in_flight = 0
+
+    async def _acquire_slot(self):
+        # Waiting for a local slot is our own saturation, not an upstream failure,
+        # so it has its own deadline and never reaches the breaker
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise LLMBusy(f"All {self.max_concurrency} LLM slots busy for {self.timeout}s")
+
+    async def complete(self, messages, max_tokens=150, temperature=0.7):
+        """Return the completion text.
+
+        Raises LLMBusy if no slot frees up within the timeout, and CircuitOpen
+        without calling out while the circuit is open. The deadline the
+        breaker counts starts once a slot is held.
+        """
+        await self._acquire_slot()
+        try:
+            if not self.breaker.allow():
+                raise CircuitOpen(self.breaker.last_error)
+            self.in_flight += 1
+            try:
+                content = await asyncio.wait_for(
+                    self._complete(messages, max_tokens, temperature),
+                    timeout=self.timeout
+                )
+            except asyncio.CancelledError:
+                # The caller went away; that says nothing about the upstream's health
+                self.breaker.cancel_trial()
+                raise
+            except Exception as llm_error:
+                self.breaker.record_failure(llm_error, trip=isinstance(llm_error, self.TRIPPING_ERRORS))
+                raise
+            finally:
+                self.in_flight -= 1
+        finally:
+            self.semaphore.release()
+        self.breaker.record_success()
+        return content
+
+    async def _complete(self, messages, max_tokens, temperature):
+        response = await openai.ChatCompletion.acreate(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+    async def stream(self, messages, max_tokens=150, temperature=0.7):
+        """Yield completion text as the model produces it.
+
+        Getting a slot works as in ``complete``. Once a slot is held, the
+        deadline applies to the first token and to every gap between tokens,
+        rather than to the whole completion.
+        """
+        await self._acquire_slot()
+        try:
+            if not self.breaker.allow():
+                raise CircuitOpen(self.breaker.last_error)
+            self.in_flight += 1
+            try:
+                response = await asyncio.wait_for(
+                    openai.ChatCompletion.acreate(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stream=True
+                    ),
+                    timeout=self.timeout
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    text = chunk.choices[0].delta.get('content')
+                    if text:
+                        yield text
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.cancel_trial()
+                raise
+            except Exception as llm_error:
+                self.breaker.record_failure(llm_error, trip=isinstance(llm_error, self.TRIPPING_ERRORS))
+                raise
+            finally:
+                self.in_flight -= 1
+        finally:
+            self.semaphore.release()
+        self.breaker.record_success()
+
+    def stats(self):
+        return {
+            'model': self.model,
+            'timeout': self.timeout,
+            'in_flight': self.in_flight,
+            'max_concurrency': self.max_concurrency,
+            'circuit': self.breaker.status()
+        }
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+class MarketSnapshotStore:
+    """Latest market snapshot, held in memory and persisted to Mongo.
+
+    Only the worker holding the poller lease refreshes quotes and writes
+    snapshots; every other worker just reloads the newest persisted one, so all
+    uvicorn workers serve the same data from a single upstream budget.
+    """
+
+    LEASE_ID = 'market_snapshot_poller'
+
+    def __init__(self, snapshots, leases, worker_id, lease_ttl, retention_days):
+        self.snapshots = snapshots
+        self.leases = leases
+        self.worker_id = worker_id
+        self.lease_ttl = lease_ttl
+        self.retention_days = retention_days
+        self.latest = None
+        self.is_leader = False
+
+    async def ensure_indexes(self):
+        # Serves the newest-first read and expires old snapshots
+        await self.snapshots.create_index(
+            [('created_at', DESCENDING)],
+            expireAfterSeconds=int(self.retention_days * 24 * 60 * 60)
+        )
+
+    async def claim_lease(self):
+        """Take or renew the poller lease; returns whether this worker holds it"""
+        now = datetime.utcnow()
+        try:
+            await self.leases.find_one_and_update(
+                {'_id': self.LEASE_ID, '$or': [{'owner': self.worker_id}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'owner': self.worker_id, 'expires_at': now + timedelta(seconds=self.lease_ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self.is_leader = True
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            self.is_leader = False
+        return self.is_leader
+
+    async def release_lease(self):
+        if self.is_leader:
+            await self.leases.delete_one({'_id': self.LEASE_ID, 'owner': self.worker_id})
+            self.is_leader = False
+
+    async def load_latest(self):
+        snapshot = await self.snapshots.find_one({}, sort=[('created_at', DESCENDING)])
+        if snapshot is not None:
+            snapshot.pop('_id', None)
+            self.latest = snapshot
+        return self.latest
+
+    async def save(self, market_data):
+        snapshot = {'created_at': datetime.utcnow(), 'market_data': market_data}
+        await self.snapshots.insert_one(dict(snapshot))
+        self.latest = snapshot
+        return snapshot
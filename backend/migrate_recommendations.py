@@ -0,0 +1,76 @@
+"""Collapse legacy investment_recommendations into one document per user.
+
+Recommendations used to be inserted as a new document on every request; they
+are now upserted per user, and a unique user_id index keeps it that way. That
+index can't be built while the old duplicates exist. For each user with more
+than one document, this keeps the newest, adds the older ones (oldest first)
+to the front of its ``history``, copies them in full to
+investment_recommendations_archive and only then removes them from
+investment_recommendations. Re-running it is safe.
+
+Dry run by default: it only reports what it would do. Pass --apply to change
+anything, then restart the server (or run python db_indexes.py) to build the
+index.
+
+Usage: python migrate_recommendations.py [--apply]
+"""
+import argparse
+import asyncio
+import os
+
+from pymongo import ReplaceOne
+
+from recommendation_cache import history_entry
+
+ARCHIVE_COLLECTION = 'investment_recommendations_archive'
+
+
+def duplicates_pipeline():
+    return [
+        {'$match': {'user_id': {'$type': 'string'}}},
+        {'$sort': {'user_id': 1, 'timestamp': -1}},
+        {'$group': {'_id': '$user_id', 'keep': {'$first': '$_id'}, 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}},
+    ]
+
+
+async def fold_user(db, keep, older_ids, history_limit):
+    """Archive a user's older documents, fold their summaries into the kept one, then remove them"""
+    older = await db.investment_recommendations.find({'_id': {'$in': older_ids}}).sort('timestamp', 1).to_list(None)
+    if not older:
+        return 0
+    # Upserts by _id, so a run interrupted after this step can simply be repeated
+    await db[ARCHIVE_COLLECTION].bulk_write([ReplaceOne({'_id': document['_id']}, document, upsert=True) for document in older])
+    if history_limit > 0:
+        push = {'$each': [history_entry(document) for document in older], '$position': 0, '$slice': -history_limit}
+        await db.investment_recommendations.update_one({'_id': keep}, {'$push': {'history': push}})
+    result = await db.investment_recommendations.delete_many({'_id': {'$in': [document['_id'] for document in older]}})
+    return result.deleted_count
+
+
+async def migrate(db, apply, history_limit):
+    users = documents = 0
+    async for group in db.investment_recommendations.aggregate(duplicates_pipeline(), allowDiskUse=True):
+        older_ids = [document_id for document_id in group['ids'] if document_id != group['keep']]
+        users += 1
+        if apply:
+            documents += await fold_user(db, group['keep'], older_ids, history_limit)
+        else:
+            documents += len(older_ids)
+    action = "archived and folded" if apply else "would archive and fold"
+    print(f"{users} users with duplicate recommendations; {action} {documents} older documents")
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--apply', action='store_true', help="make the changes (default: dry run)")
+    args = parser.parse_args()
+
+    db = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017')).financial_advisor
+    await migrate(db, args.apply, int(os.environ.get('RECOMMENDATION_HISTORY_LIMIT', 5)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+def latest_lookup(collection, field):
+    """$lookup stage attaching the newest document of ``collection`` for the same user_id as ``field``.
+
+    The equality join plus sort/limit is served by the (user_id, timestamp desc)
+    index, so each lookup reads one index entry and one document.
+    """
+    return {
+        '$lookup': {
+            'from': collection,
+            'localField': 'user_id',
+            'foreignField': 'user_id',
+            'pipeline': [
+                {'$sort': {'timestamp': -1}},
+                {'$limit': 1},
+                {'$project': {'_id': 0, 'history': 0}}
+            ],
+            'as': field
+        }
+    }
+
+
+def portfolio_state_pipeline(user_id):
+    return [
+        {'$match': {'user_id': user_id}},
+        {'$limit': 1},
+        latest_lookup('investment_recommendations', 'recommendation'),
+        latest_lookup('risk_assessments', 'risk_assessment'),
+        {'$project': {'_id': 0}}
+    ]
+
+
+async def load_portfolio_state(db, user_id):
+    """(profile, latest recommendation, latest risk assessment) in one round-trip; missing parts are None"""
+    async for state in db.user_profiles.aggregate(portfolio_state_pipeline(user_id)):
+        recommendation = state.pop('recommendation')
+        risk_assessment = state.pop('risk_assessment')
+        return state, (recommendation or [None])[0], (risk_assessment or [None])[0]
+    return None, None, None
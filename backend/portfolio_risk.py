@@ -0,0 +1,156 @@
+from functools import lru_cache, reduce
+from statistics import NormalDist
+
+import numpy as np
+
+from projections import ASSET_CLASS_ASSUMPTIONS, DEFAULT_ASSUMPTION
+
+TRADING_DAYS = 252
+MIN_OBSERVATIONS = 60
+
+
+class ReturnModel:
+    """Aligned daily log returns for a universe of symbols over one date window"""
+
+    def __init__(self, symbols, dates, returns):
+        self.symbols = symbols
+        self.index = {symbol: column for column, symbol in enumerate(symbols)}
+        self.dates = dates
+        self.returns = returns
+        self.mean = returns.mean(axis=0)
+        self.covariance = np.atleast_2d(np.cov(returns, rowvar=False))
+        for array in (self.dates, self.returns, self.mean, self.covariance):
+            # Shared through the cache, so nobody gets to modify them
+            array.setflags(write=False)
+
+    @property
+    def start(self):
+        return str(self.dates[0])
+
+    @property
+    def end(self):
+        return str(self.dates[-1])
+
+
+def resolve_window(store, symbols, start=None, end=None, lookback_days=3 * 365):
+    """Concrete (start, end) dates: end defaults to the last day every symbol has, start to lookback_days before it"""
+    if end is None:
+        last_dates = [store.last_date(symbol) for symbol in symbols]
+        if any(last is None for last in last_dates):
+            return None, None
+        end = min(last_dates)
+    end = np.datetime64(end, 'D')
+    start = end - np.timedelta64(lookback_days, 'D') if start is None else np.datetime64(start, 'D')
+    return str(start), str(end)
+
+
+@lru_cache(maxsize=64)
+def _return_model(store, symbols, start, end, versions):
+    # ``versions`` (rows per symbol) is only part of the key, so new ingested data invalidates it
+    series = [store.read(symbol, start, end) for symbol in symbols]
+    dates = reduce(np.intersect1d, [prices['date'] for prices in series])
+    closes = np.column_stack([
+        prices['close'][np.searchsorted(prices['date'], dates)] for prices in series
+    ]) if len(dates) else np.empty((0, len(symbols)))
+    valid = np.isfinite(closes).all(axis=1) & (closes > 0).all(axis=1)
+    dates, closes = dates[valid], closes[valid]
+    if len(closes) <= MIN_OBSERVATIONS:
+        return None
+    # Each return is dated by the day it ends on
+    return ReturnModel(symbols, dates[1:], np.diff(np.log(closes), axis=0))
+
+
+def load_return_model(store, symbols, start, end):
+    """Return model for the symbols over [start, end], cached per universe and window; None without enough history"""
+    symbols = tuple(symbols)
+    versions = tuple(store.info(symbol)['rows'] for symbol in symbols)
+    return _return_model(store, symbols, start, end, versions)
+
+
+def bucket_exposures(allocation, proxies, symbols):
+    """Split allocation weights (in percent) across the proxy instruments of each bucket.
+
+    Returns the priced buckets, a (buckets x instruments) matrix of weights
+    within each bucket, their portfolio weights, and the weights of buckets
+    that have no price history (debt, cash) and are modelled as riskless.
+    """
+    total = sum(weight for weight in allocation.values() if weight > 0)
+    index = {symbol: column for column, symbol in enumerate(symbols)}
+    priced, rows, weights, unpriced = [], [], [], {}
+    for bucket, weight in allocation.items():
+        if weight <= 0:
+            continue
+        members = [index[symbol] for symbol in proxies.get(bucket, ()) if symbol in index]
+        if not members:
+            unpriced[bucket] = weight / total
+            continue
+        row = np.zeros(len(symbols))
+        row[members] = 1.0 / len(members)
+        priced.append(bucket)
+        rows.append(row)
+        weights.append(weight / total)
+    matrix = np.array(rows) if rows else np.empty((0, len(symbols)))
+    return priced, matrix, np.array(weights), unpriced
+
+
+def correlation_from_covariance(covariance):
+    volatility = np.sqrt(np.diag(covariance))
+    scale = np.outer(volatility, volatility)
+    return np.divide(covariance, scale, out=np.eye(len(covariance)), where=scale > 0)
+
+
+def tail_risk(returns, mean, volatility, confidence):
+    """Historical and parametric one-day VaR/CVaR, as positive loss fractions"""
+    tail = 1 - confidence
+    historical_var = -np.quantile(returns, tail)
+    losses = returns[returns <= -historical_var]
+    z = NormalDist().inv_cdf(tail)
+    return {
+        'historical_var': float(historical_var),
+        'historical_cvar': float(-losses.mean()) if len(losses) else float(historical_var),
+        'parametric_var': float(-(mean + z * volatility)),
+        'parametric_cvar': float(-(mean - volatility * NormalDist().pdf(z) / tail)),
+    }
+
+
+def portfolio_risk_metrics(model, allocation, proxies, market_symbol, confidence=0.95):
+    """Volatility, VaR/CVaR, beta and bucket correlations for an allocation.
+
+    Each priced bucket is an equal-weighted basket of its proxy instruments;
+    everything reduces to the cached instrument covariance, so the cost is a
+    few small matrix products whatever the window length.
+    """
+    buckets, members, bucket_weights, unpriced = bucket_exposures(allocation, proxies, model.symbols)
+    if not buckets:
+        return None
+    instrument_weights = bucket_weights @ members
+
+    # Riskless buckets add their assumed drift and nothing to the variance
+    riskless_drift = sum(
+        weight * np.log1p(ASSET_CLASS_ASSUMPTIONS.get(bucket, DEFAULT_ASSUMPTION)[0]) / TRADING_DAYS
+        for bucket, weight in unpriced.items()
+    )
+    portfolio_returns = model.returns @ instrument_weights + riskless_drift
+    daily_mean = float(model.mean @ instrument_weights + riskless_drift)
+    daily_volatility = float(np.sqrt(instrument_weights @ model.covariance @ instrument_weights))
+
+    market = model.index[market_symbol]
+    market_variance = model.covariance[market, market]
+    instrument_betas = model.covariance[:, market] / market_variance
+    bucket_covariance = members @ model.covariance @ members.T
+
+    return {
+        'window': {'start': model.start, 'end': model.end, 'observations': len(model.returns)},
+        'confidence': confidence,
+        'annualized_return': daily_mean * TRADING_DAYS,
+        'annualized_volatility': daily_volatility * float(np.sqrt(TRADING_DAYS)),
+        'beta': float(instrument_weights @ instrument_betas),
+        **tail_risk(portfolio_returns, daily_mean, daily_volatility, confidence),
+        'bucket_betas': dict(zip(buckets, (members @ instrument_betas).tolist())),
+        'bucket_volatility': dict(zip(buckets, (np.sqrt(np.diag(bucket_covariance)) * np.sqrt(TRADING_DAYS)).tolist())),
+        'correlation_matrix': {
+            'buckets': buckets,
+            'matrix': np.round(correlation_from_covariance(bucket_covariance), 4).tolist()
+        },
+        'riskless_buckets': unpriced,
+    }
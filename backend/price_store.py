@@ -0,0 +1,136 @@
+import csv
+import os
+import re
+
+import numpy as np
+
+# One fixed-width record per trading day. Each symbol is a single append-only
+# file of these records, read back through np.memmap, so a column such as
+# ``prices['close']`` or a date range is a view into the mapped file, not a copy.
+PRICE_DTYPE = np.dtype([
+    ('date', '<M8[D]'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+SYMBOL_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9.&^-]{0,23}$')
+
+
+class PriceStore:
+    """Daily price history on local disk, one memory-mapped file per symbol"""
+
+    def __init__(self, root):
+        self.root = root
+        self._maps = {}  # symbol -> memmap over the file as of the last read
+
+    def path(self, symbol):
+        if not SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        return os.path.join(self.root, f"{symbol}.prices")
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[:-len('.prices')] for name in os.listdir(self.root) if name.endswith('.prices'))
+
+    def _map(self, symbol):
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=PRICE_DTYPE)
+        # Ignore a trailing partial record left by an interrupted append
+        rows = os.path.getsize(path) // PRICE_DTYPE.itemsize
+        cached = self._maps.get(symbol)
+        if cached is None or len(cached) != rows:
+            cached = np.memmap(path, dtype=PRICE_DTYPE, mode='r', shape=(rows,)) if rows else np.empty(0, dtype=PRICE_DTYPE)
+            self._maps[symbol] = cached
+        return cached
+
+    def read(self, symbol, start=None, end=None):
+        """Rows with start <= date <= end (either bound optional), as a zero-copy view"""
+        prices = self._map(symbol)
+        dates = prices['date']
+        low = 0 if start is None else np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+        high = len(prices) if end is None else np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+        return prices[low:high]
+
+    def last_date(self, symbol):
+        prices = self._map(symbol)
+        return prices['date'][-1] if len(prices) else None
+
+    def append(self, symbol, records):
+        """Append the records dated after the last stored day; returns how many were written"""
+        records = np.asarray(records, dtype=PRICE_DTYPE)
+        records = records[np.argsort(records['date'], kind='stable')]
+        if len(records):
+            # Keep the last record for each date
+            _, last_of_day = np.unique(records['date'][::-1], return_index=True)
+            records = records[len(records) - 1 - last_of_day]
+        last = self.last_date(symbol)
+        if last is not None:
+            records = records[records['date'] > last]
+        if not len(records):
+            return 0
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.path(symbol), 'ab') as prices_file:
+            prices_file.write(records.tobytes())
+        self._maps.pop(symbol, None)
+        return len(records)
+
+    def info(self, symbol):
+        prices = self._map(symbol)
+        return {
+            'symbol': symbol,
+            'rows': len(prices),
+            'first_date': str(prices['date'][0]) if len(prices) else None,
+            'last_date': str(prices['date'][-1]) if len(prices) else None
+        }
+
+
+def records_from_rows(rows):
+    """Build price records from (date, open, high, low, close, volume) tuples"""
+    records = np.empty(len(rows), dtype=PRICE_DTYPE)
+    for index, (date, *values) in enumerate(rows):
+        records[index] = (np.datetime64(date, 'D'), *(float(value) for value in values))
+    return records
+
+
+def parse_daily_series(payload):
+    """Price records from an Alpha Vantage TIME_SERIES_DAILY response"""
+    series = payload.get('Time Series (Daily)')
+    if series is None:
+        # Throttling and bad-symbol responses come back as 200 with a message instead
+        message = payload.get('Note') or payload.get('Information') or payload.get('Error Message')
+        raise ValueError(message or "No daily series in response")
+    return records_from_rows([
+        (date, bar['1. open'], bar['2. high'], bar['3. low'], bar['4. close'], bar['5. volume'])
+        for date, bar in series.items()
+    ])
+
+
+def read_price_csv(path):
+    """Price records from a CSV with date (or timestamp), open, high, low, close and volume columns"""
+    with open(path, newline='') as csv_file:
+        reader = csv.DictReader(csv_file)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        date_column = columns.get('date') or columns.get('timestamp')
+        missing = [field for field in PRICE_FIELDS if field not in columns]
+        if date_column is None or missing:
+            raise ValueError(f"{path}: expected date/timestamp, {', '.join(PRICE_FIELDS)} columns")
+        return records_from_rows([
+            (row[date_column], *(row[columns[field]] or 'nan' for field in PRICE_FIELDS))
+            for row in reader if row[date_column]
+        ])
+
+
+def ingest_csv_dir(store, directory, symbols=None):
+    """Load every <SYMBOL>.csv in a directory into the store; returns rows appended per symbol"""
+    appended = {}
+    for name in sorted(os.listdir(directory)):
+        symbol, extension = os.path.splitext(name)
+        if extension.lower() != '.csv' or (symbols is not None and symbol not in symbols):
+            continue
+        appended[symbol] = store.append(symbol, read_price_csv(os.path.join(directory, name)))
+    return appended
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class QuoteCache:
+    """In-process LRU cache of upstream quotes with stale-while-revalidate.
+
+    Entries younger than ``ttl`` seconds are served as-is. Expired entries keep
+    being served while a single background task refreshes them, so callers only
+    ever wait on the upstream when a symbol has never been fetched.
+
+    Pinned symbols are never evicted and don't count towards ``max_size``, so
+    ad-hoc lookups can't push out the symbols the market views depend on.
+    """
+
+    def __init__(self, ttl, max_size=256, pinned=()):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.pinned = frozenset(pinned)
+        self._entries = OrderedDict()  # symbol -> (value, cached_at)
+        self._refreshing = {}  # symbol -> background refresh task
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, symbol):
+        """Return (value, cached_at) for a symbol, or None if it was never cached"""
+        entry = self._entries.get(symbol)
+        if entry is not None:
+            self._entries.move_to_end(symbol)
+        return entry
+
+    def peek(self, symbol):
+        """Like get, but without touching the LRU order"""
+        return self._entries.get(symbol)
+
+    def set(self, symbol, value, cached_at=None):
+        entry = (value, cached_at if cached_at is not None else time.time())
+        self._entries[symbol] = entry
+        self._entries.move_to_end(symbol)
+        if symbol not in self.pinned:
+            self._evict()
+        return entry
+
+    def pin(self, symbols):
+        self.pinned = self.pinned | frozenset(symbols)
+
+    def _evict(self):
+        if len(self._entries) <= self.max_size:
+            return
+        unpinned = [symbol for symbol in self._entries if symbol not in self.pinned]  # oldest first
+        for evicted in unpinned[:max(len(unpinned) - self.max_size, 0)]:
+            del self._entries[evicted]
+            task = self._refreshing.pop(evicted, None)
+            if task is not None:
+                task.cancel()
+
+    def is_fresh(self, cached_at):
+        return time.time() - cached_at < self.ttl
+
+    async def get_or_fetch(self, symbol, fetch):
+        """Return (value, cached_at) for a symbol, calling ``fetch(symbol)`` on a miss.
+
+        Returns (None, None) when the symbol is uncached and ``fetch`` had nothing
+        to cache (e.g. a throttled upstream response).
+        """
+        entry = self.get(symbol)
+        if entry is None:
+            value = await fetch(symbol)
+            if value is None:
+                return None, None
+            return self.set(symbol, value)
+
+        if not self.is_fresh(entry[1]) and symbol not in self._refreshing:
+            self._refreshing[symbol] = asyncio.create_task(self._refresh(symbol, fetch))
+        return entry
+
+    async def _refresh(self, symbol, fetch):
+        try:
+            value = await fetch(symbol)
+            if value is not None:
+                self.set(symbol, value)
+        except Exception as refresh_error:
+            # Keep serving the stale value; the next read schedules another attempt
+            print(f"Background refresh failed for {symbol}: {refresh_error!r}")
+        finally:
+            if self._refreshing.get(symbol) is asyncio.current_task():
+                del self._refreshing[symbol]
+
+    def stats(self):
+        now = time.time()
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'pinned': len(self.pinned),
+            'ttl': self.ttl,
+            'stale': sum(1 for _, cached_at in self._entries.values() if now - cached_at >= self.ttl),
+            'refreshing': len(self._refreshing)
+        }
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key onto one in-flight upstream request.
+
+    The first caller for a key starts the call; everyone arriving while it is
+    still running awaits the same task and receives the same result or error.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> in-flight task
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        # Shield so one caller timing out or disconnecting doesn't cancel the
+        # request for everyone else waiting on it
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the error as retrieved even if every waiter went away
+            task.exception()
+
+    def stats(self):
+        return {'in_flight': len(self._calls), 'started': self.started, 'coalesced': self.coalesced}
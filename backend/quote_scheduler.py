@@ -0,0 +1,101 @@
+import asyncio
+import math
+import time
+from collections import Counter
+
+
+class TokenBucket:
+    """Continuously refilling token bucket: ``capacity`` tokens per ``period`` seconds"""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self):
+        self._refill()
+        return self.tokens
+
+    def take(self):
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait_time(self):
+        """Seconds until at least one token is available"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def status(self):
+        return {
+            'remaining': math.floor(self.available()),
+            'capacity': self.capacity,
+            'next_token_in_seconds': round(self.wait_time(), 1)
+        }
+
+
+class QuoteScheduler:
+    """Owns the Alpha Vantage key's call budget and decides what to refresh next.
+
+    Every upstream call must take a token from both the per-minute and the
+    per-day bucket. Refresh order puts the priority symbols (index quotes)
+    first, then the most-requested symbols, then whichever has gone longest
+    without a refresh.
+    """
+
+    def __init__(self, calls_per_minute, calls_per_day, priority_symbols=()):
+        self.minute = TokenBucket(calls_per_minute, 60)
+        self.day = TokenBucket(calls_per_day, 24 * 60 * 60)
+        self.priority_symbols = list(priority_symbols)
+        self.demand = Counter()
+        self.calls_made = 0
+        self.calls_rejected = 0
+
+    def record_demand(self, symbol):
+        self.demand[symbol] += 1
+
+    def refresh_order(self, symbols, last_refreshed):
+        """Order symbols for refreshing; ``last_refreshed(symbol)`` returns a timestamp or None"""
+        def priority(symbol):
+            is_priority = symbol in self.priority_symbols
+            return (not is_priority, -self.demand[symbol], last_refreshed(symbol) or 0)
+
+        return sorted(dict.fromkeys([*self.priority_symbols, *symbols]), key=priority)
+
+    async def acquire(self, wait=False):
+        """Take one call from the budget.
+
+        With ``wait`` the caller sleeps until the per-minute bucket refills;
+        returns False without waiting once the daily budget is spent.
+        """
+        while True:
+            if self.day.available() < 1:
+                self.calls_rejected += 1
+                return False
+            if self.minute.available() >= 1:
+                self.minute.take()
+                self.day.take()
+                self.calls_made += 1
+                return True
+            if not wait:
+                self.calls_rejected += 1
+                return False
+            await asyncio.sleep(self.minute.wait_time())
+
+    def budget(self):
+        return {
+            'per_minute': self.minute.status(),
+            'per_day': self.day.status(),
+            'calls_made': self.calls_made,
+            'calls_rejected': self.calls_rejected,
+            'most_requested': self.demand.most_common(5)
+        }
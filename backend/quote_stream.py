@@ -0,0 +1,97 @@
+import asyncio
+
+# Fields that don't count as a change on their own
+VOLATILE_FIELDS = ('cached_at', 'age_seconds')
+
+DROP = object()
+
+
+class QuoteSubscriber:
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.symbols = set()
+        self.dropped = False
+
+    def offer(self, message):
+        """Queue a message without waiting; returns False if the client can't keep up"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop(self):
+        # Discard the backlog so the drop marker is guaranteed to fit
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(DROP)
+
+
+class QuoteBroadcaster:
+    """Fan out quote changes from one refresher to every WebSocket subscriber.
+
+    Publishing never awaits a client: each subscriber has a bounded queue and a
+    client whose queue is full is dropped instead of backing up the broadcast.
+    """
+
+    def __init__(self, queue_size=32):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.quotes = {}  # symbol -> last published quote
+        self.dropped = 0
+
+    def connect(self):
+        subscriber = QuoteSubscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def subscribe(self, subscriber, symbols):
+        """Add symbols to a subscription and queue their current quotes"""
+        added = set(symbols) - subscriber.symbols
+        subscriber.symbols |= added
+        current = {symbol: self.quotes[symbol] for symbol in added if symbol in self.quotes}
+        if current:
+            self._send(subscriber, {'type': 'quotes', 'quotes': current})
+
+    def unsubscribe(self, subscriber, symbols):
+        subscriber.symbols -= set(symbols)
+
+    def publish(self, quotes):
+        """Push the quotes that changed since the last publish to interested subscribers"""
+        changed = {
+            symbol: quote for symbol, quote in quotes.items()
+            if symbol not in self.quotes or not same_quote(self.quotes[symbol], quote)
+        }
+        self.quotes.update(quotes)
+        if not changed:
+            return 0
+
+        for subscriber in list(self.subscribers):
+            wanted = {symbol: changed[symbol] for symbol in subscriber.symbols if symbol in changed}
+            if wanted:
+                self._send(subscriber, {'type': 'quotes', 'quotes': wanted})
+        return len(changed)
+
+    def _send(self, subscriber, message):
+        if subscriber.dropped:
+            return
+        if not subscriber.offer(message):
+            subscriber.drop()
+            self.subscribers.discard(subscriber)
+            self.dropped += 1
+
+    def stats(self):
+        return {
+            'subscribers': len(self.subscribers),
+            'dropped': self.dropped,
+            'queue_size': self.queue_size,
+            'symbols': len(self.quotes)
+        }
+
+
+def same_quote(old, new):
+    return all(old.get(key) == new.get(key) for key in set(old) | set(new) if key not in VOLATILE_FIELDS)
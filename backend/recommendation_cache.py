@@ -0,0 +1,82 @@
+import hashlib
+import json
+
+from pymongo.errors import DuplicateKeyError
+
+# Profile fields that change the recommendation: the risk score inputs, the
+# investable amount and the goals quoted to the LLM
+SCORING_FIELDS = ('age', 'monthly_income', 'monthly_expenses', 'emergency_fund', 'investment_experience', 'investment_horizon')
+
+
+def profile_hash(profile, allocation_version=None):
+    """Content hash of the recommendation-relevant profile fields.
+
+    ``allocation_version`` identifies the allocation table in use (e.g. when
+    the efficient frontier was computed), so a new table invalidates old hashes.
+    """
+    content = {field: profile[field] for field in SCORING_FIELDS}
+    content['investment_experience'] = str(content['investment_experience']).lower()
+    content['investment_horizon'] = str(content['investment_horizon']).lower()
+    content['financial_goals'] = sorted(' '.join(str(goal).lower().split()) for goal in profile.get('financial_goals') or [])
+    content['allocation_version'] = allocation_version
+    raw = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def history_entry(recommendation):
+    """The summary of a recommendation kept in its user's ``history`` array"""
+    return {key: recommendation.get(key) for key in ('allocation', 'risk_category', 'profile_hash', 'timestamp')}
+
+
+class RecommendationStore:
+    """One current recommendation document per user, which doubles as the result cache.
+
+    A request whose profile hash matches the stored document is served from
+    it; otherwise the new recommendation replaces it in place (upsert), and a
+    summary of it is pushed onto a ``history`` array capped at
+    ``history_limit`` entries (0 keeps no history). The unique user_id index
+    from db_indexes makes concurrent first-time upserts for a user collapse
+    into one document: the one that loses the insert race retries as an update.
+    """
+
+    def __init__(self, collection, history_limit=5):
+        self.collection = collection
+        self.history_limit = history_limit
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id, content_hash):
+        if not user_id:
+            # Without a user there is no current document to match, only other people's
+            return None
+        cached = await self.collection.find_one(
+            {'user_id': user_id, 'profile_hash': content_hash},
+            projection={'_id': 0, 'history': 0},
+            sort=[('timestamp', -1)]
+        )
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    async def save(self, recommendation):
+        if not recommendation.get('user_id'):
+            raise ValueError("Only recommendations for a known user_id are stored")
+        update = {'$set': recommendation}
+        if self.history_limit > 0:
+            update['$push'] = {'history': {'$each': [history_entry(recommendation)], '$slice': -self.history_limit}}
+        try:
+            await self.collection.update_one({'user_id': recommendation['user_id']}, update, upsert=True)
+        except DuplicateKeyError:
+            # Another request inserted this user's document first; now it exists, so this updates it
+            await self.collection.update_one({'user_id': recommendation['user_id']}, update, upsert=True)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'history_limit': self.history_limit,
+        }
@@ -0,0 +1,70 @@
+import numpy as np
+
+# Column-wise version of the assess_risk questionnaire. Each banded factor is
+# a searchsorted lookup into (edges, scores); ``side`` encodes whether the
+# single-profile code compares with > ("left") or >= / < ("right").
+AGE_EDGES, AGE_SCORES, AGE_SIDE = np.array([25, 35, 45, 55]), np.array([25, 20, 15, 10, 5]), 'right'
+INCOME_RATIO_EDGES, INCOME_RATIO_SCORES, INCOME_RATIO_SIDE = np.array([0.1, 0.2, 0.3, 0.5]), np.array([0, 5, 10, 15, 20]), 'left'
+EMERGENCY_EDGES, EMERGENCY_SCORES, EMERGENCY_SIDE = np.array([1, 3, 6]), np.array([0, 4, 7, 10]), 'right'
+CATEGORY_EDGES, CATEGORIES = np.array([45, 70]), np.array(['Low Risk', 'Moderate Risk', 'High Risk'])
+
+EXPERIENCE_SCORES = {'beginner': 5, 'intermediate': 12, 'experienced': 20}
+HORIZON_SCORES = {'short': 5, 'medium': 10, 'long': 15}
+DEFAULT_LABEL_SCORE = 5
+
+
+def band_scores(values, edges, scores, side):
+    # NaN fails every comparison in the scalar code, which lands it in the lowest band
+    values = np.where(np.isnan(values), -np.inf, values) if values.dtype.kind == 'f' else values
+    return scores[np.searchsorted(edges, values, side=side)]
+
+
+def label_scores(labels, table, default=DEFAULT_LABEL_SCORE):
+    """Map free-text labels to scores, looking up each distinct label only once"""
+    unique, inverse = np.unique(np.char.lower(np.asarray(labels, dtype=str)), return_inverse=True)
+    return np.array([table.get(label, default) for label in unique], dtype=np.int64)[inverse.reshape(-1)]
+
+
+def safe_ratio(numerator, denominator):
+    """numerator / denominator where denominator > 0, else 0 (as assess_risk does)"""
+    out = np.zeros_like(numerator, dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def score_profiles(profiles):
+    """Score a list of UserProfile objects; returns one array per factor plus totals and categories"""
+    age = np.array([profile.age for profile in profiles], dtype=np.int64)
+    income = np.array([profile.monthly_income for profile in profiles], dtype=np.float64)
+    expenses = np.array([profile.monthly_expenses for profile in profiles], dtype=np.float64)
+    emergency_fund = np.array([profile.emergency_fund for profile in profiles], dtype=np.float64)
+
+    factors = {
+        'age': band_scores(age, AGE_EDGES, AGE_SCORES, AGE_SIDE),
+        'income_ratio': band_scores(safe_ratio(income - expenses, income), INCOME_RATIO_EDGES, INCOME_RATIO_SCORES, INCOME_RATIO_SIDE),
+        'experience': label_scores([profile.investment_experience for profile in profiles], EXPERIENCE_SCORES),
+        'horizon': label_scores([profile.investment_horizon for profile in profiles], HORIZON_SCORES),
+        'emergency_fund': band_scores(safe_ratio(emergency_fund, expenses), EMERGENCY_EDGES, EMERGENCY_SCORES, EMERGENCY_SIDE),
+    }
+    total = sum(factors.values())
+    categories = CATEGORIES[np.searchsorted(CATEGORY_EDGES, total, side='right')]
+    return factors, total, categories
+
+
+def assessment_dicts(profiles):
+    """Batch equivalent of calling assess_risk on each profile: same keys, types and values"""
+    if not profiles:
+        return []
+    factors, total, categories = score_profiles(profiles)
+    factor_columns = {name: scores.tolist() for name, scores in factors.items()}
+    totals = total.astype(np.float64).tolist()
+    categories = categories.tolist()
+    return [
+        {
+            'user_id': profile.user_id,
+            'risk_score': totals[row],
+            'risk_category': categories[row],
+            'assessment_factors': {name: column[row] for name, column in factor_columns.items()}
+        }
+        for row, profile in enumerate(profiles)
+    ]
@@ -1,14 +1,44 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
+from collections import Counter
 import os
-import requests
+import re
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import time
+import httpx
+import numpy as np
 import openai
-from datetime import datetime
+from datetime import date, datetime
 import json
 import uuid
 from motor.motor_asyncio import AsyncIOMotorClient
+from quote_cache import QuoteCache, SingleFlight
+from quote_scheduler import QuoteScheduler
+from market_snapshots import MarketSnapshotStore
+from quote_stream import DROP, QuoteBroadcaster
+from llm import CircuitBreaker, CircuitOpen, LLMBusy, LLMClient
+from chat_cache import ChatResponseCache, chat_cache_key
+from intents import IntentMatcher
+from risk_scoring import assessment_dicts
+from projections import simulate_projection, simulate_variants
+from price_store import PriceStore, ingest_csv_dir, parse_daily_series
+from portfolio_risk import TRADING_DAYS, bucket_exposures, load_return_model, portfolio_risk_metrics, resolve_window
+from efficient_frontier import FRONTIER_BUCKETS, bucket_moments, build_frontiers
+from backtest import backtest, monthly_bucket_returns
+from stress import PRESET_SCENARIOS, STRESS_BUCKETS, run_stress_test
+from goals import RETURN_BANDS, plan_goals
+from db_indexes import IndexCoverageError, IndexCreationError, check_query_plans, ensure_indexes
+from portfolio_queries import load_portfolio_state
+from dashboards import DashboardStore
+from write_behind import WriteBehindQueue
+from recommendation_cache import RecommendationStore, profile_hash
+from pymongo.errors import DuplicateKeyError
 
 app = FastAPI()
 
@@ -33,6 +63,216 @@ OPENAI_KEY = os.environ.get('OPENAI_KEY', 'sk-proj-T1-G_IR5RqNu3Hohq87wxhv7KLdXL
 
 openai.api_key = OPENAI_KEY
 
+# LLM calls: async, deadline-bound, capped and guarded by a circuit breaker
+OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-3.5-turbo')
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 8))
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 10))
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('LLM_BREAKER_FAILURE_THRESHOLD', 3))
+LLM_BREAKER_RESET_TIMEOUT = float(os.environ.get('LLM_BREAKER_RESET_TIMEOUT', 60))
+
+llm_client = LLMClient(
+    model=OPENAI_MODEL,
+    timeout=LLM_TIMEOUT,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    breaker=CircuitBreaker(
+        failure_threshold=LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=LLM_BREAKER_RESET_TIMEOUT
+    )
+)
+
+# Upstream quote fetching
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+NIFTY_SYMBOL = 'NSEI'
+NIFTY_FALLBACK = {'price': 18500, 'change': 45.2, 'change_percent': '0.24%'}
+QUOTE_FETCH_TIMEOUT = float(os.environ.get('QUOTE_FETCH_TIMEOUT', 10))
+QUOTE_FETCH_CONCURRENCY = int(os.environ.get('QUOTE_FETCH_CONCURRENCY', 5))
+
+QUOTE_CACHE_TTL = float(os.environ.get('QUOTE_CACHE_TTL', 60))
+QUOTE_CACHE_MAX_SIZE = int(os.environ.get('QUOTE_CACHE_MAX_SIZE', 256))
+QUOTE_REFRESH_INTERVAL = float(os.environ.get('QUOTE_REFRESH_INTERVAL', 15))
+
+MARKET_SNAPSHOT_INTERVAL = float(os.environ.get('MARKET_SNAPSHOT_INTERVAL', 30))
+MARKET_SNAPSHOT_RETENTION_DAYS = float(os.environ.get('MARKET_SNAPSHOT_RETENTION_DAYS', 7))
+
+QUOTE_STREAM_QUEUE_SIZE = int(os.environ.get('QUOTE_STREAM_QUEUE_SIZE', 32))
+QUOTE_STREAM_SEND_TIMEOUT = float(os.environ.get('QUOTE_STREAM_SEND_TIMEOUT', 10))
+
+BULK_QUOTE_MAX_SYMBOLS = int(os.environ.get('BULK_QUOTE_MAX_SYMBOLS', 300))
+BULK_QUOTE_DEADLINE = float(os.environ.get('BULK_QUOTE_DEADLINE', QUOTE_FETCH_TIMEOUT))
+QUOTE_SYMBOL_PATTERN = re.compile(r'^[A-Z0-9][A-Z0-9.&^-]{0,23}$')
+
+# Alpha Vantage free tier: 5 calls/minute, 25 calls/day per key
+ALPHA_VANTAGE_CALLS_PER_MINUTE = int(os.environ.get('ALPHA_VANTAGE_CALLS_PER_MINUTE', 5))
+ALPHA_VANTAGE_CALLS_PER_DAY = int(os.environ.get('ALPHA_VANTAGE_CALLS_PER_DAY', 25))
+
+quote_semaphore = asyncio.Semaphore(QUOTE_FETCH_CONCURRENCY)
+quote_cache = QuoteCache(ttl=QUOTE_CACHE_TTL, max_size=QUOTE_CACHE_MAX_SIZE)
+quote_flights = SingleFlight()
+snapshot_store = MarketSnapshotStore(
+    db.market_snapshots,
+    db.poller_leases,
+    worker_id=str(uuid.uuid4()),
+    lease_ttl=MARKET_SNAPSHOT_INTERVAL * 3,
+    retention_days=MARKET_SNAPSHOT_RETENTION_DAYS
+)
+quote_scheduler = QuoteScheduler(
+    calls_per_minute=ALPHA_VANTAGE_CALLS_PER_MINUTE,
+    calls_per_day=ALPHA_VANTAGE_CALLS_PER_DAY,
+    priority_symbols=[NIFTY_SYMBOL]
+)
+quote_broadcaster = QuoteBroadcaster(queue_size=QUOTE_STREAM_QUEUE_SIZE)
+http_client = None
+
+def get_http_client():
+    """Shared connection pool for all upstream HTTP calls"""
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=QUOTE_FETCH_CONCURRENCY,
+                max_keepalive_connections=QUOTE_FETCH_CONCURRENCY
+            )
+        )
+    return http_client
+
+@app.on_event("startup")
+async def open_http_client():
+    get_http_client()
+
+@app.on_event("shutdown")
+async def close_http_client():
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+# Per-user collection indexes, created at startup and checked with explain()
+CHAT_HISTORY_RETENTION_DAYS = float(os.environ.get('CHAT_HISTORY_RETENTION_DAYS', 90))
+MONGO_INDEX_CHECK = os.environ.get('MONGO_INDEX_CHECK', 'strict')  # strict | warn | off
+
+@app.on_event("startup")
+async def ensure_user_indexes():
+    creation_error = None
+    try:
+        await ensure_indexes(db, CHAT_HISTORY_RETENTION_DAYS)
+    except IndexCreationError as index_error:
+        # e.g. legacy duplicates blocking a unique index; the other indexes were still built
+        creation_error = index_error
+        print(str(index_error))
+    except Exception as index_error:
+        print(f"Could not create user collection indexes: {index_error!r}")
+    if MONGO_INDEX_CHECK == 'off':
+        return
+    try:
+        await check_query_plans(db)
+    except IndexCoverageError as coverage_error:
+        print(f"Mongo index check failed: {coverage_error}")
+        if MONGO_INDEX_CHECK == 'strict':
+            if creation_error is not None:
+                # Report the real cause, not just the COLLSCAN it led to
+                raise IndexCoverageError(f"{coverage_error}. {creation_error}") from creation_error
+            raise
+    except Exception as explain_error:
+        print(f"Could not run the Mongo index check: {explain_error!r}")
+
+# Chat history inserts are buffered and written in batches off the request path.
+# Only collections nothing reads back on a request path belong here: risk
+# assessments are read right after they're written, so they stay write-through.
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get('WRITE_BEHIND_MAX_BATCH', 500))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', 0.2))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 10000))
+
+history_writer = WriteBehindQueue(
+    db,
+    max_batch=WRITE_BEHIND_MAX_BATCH,
+    flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+    max_pending=WRITE_BEHIND_MAX_PENDING
+)
+
+@app.on_event("startup")
+async def start_history_writer():
+    history_writer.start()
+
+@app.on_event("shutdown")
+async def flush_history_writer():
+    await history_writer.close()
+
+@app.get("/api/write-queue/status")
+async def get_write_queue_status():
+    return history_writer.stats()
+
+# Current recommendation per user, reused while the profile hash is unchanged
+RECOMMENDATION_HISTORY_LIMIT = int(os.environ.get('RECOMMENDATION_HISTORY_LIMIT', 5))
+
+recommendation_store = RecommendationStore(db.investment_recommendations, history_limit=RECOMMENDATION_HISTORY_LIMIT)
+
+@app.get("/api/recommendations/cache/status")
+async def get_recommendation_cache_status():
+    return recommendation_store.stats()
+
+# Materialized per-user dashboards, updated by every write path
+dashboards = DashboardStore(db.user_dashboards)
+
+async def refresh_dashboard(update, *args):
+    """Apply a dashboard update; the dashboard is derived data, so a failure never fails the write"""
+    try:
+        await update(*args)
+    except Exception as dashboard_error:
+        print(f"Dashboard update failed: {dashboard_error!r}")
+
+# Chat answer cache, keyed by normalized question and banded user context
+CHAT_CACHE_TTL = float(os.environ.get('CHAT_CACHE_TTL', 24 * 60 * 60))
+CHAT_CACHE_MAX_SIZE = int(os.environ.get('CHAT_CACHE_MAX_SIZE', 1024))
+
+chat_cache = ChatResponseCache(db.chat_response_cache, ttl=CHAT_CACHE_TTL, max_size=CHAT_CACHE_MAX_SIZE)
+
+@app.on_event("startup")
+async def ensure_chat_cache_indexes():
+    try:
+        await chat_cache.ensure_indexes()
+    except Exception as index_error:
+        print(f"Could not create chat cache indexes: {index_error!r}")
+
+# Chat intent table, compiled once into a single matcher
+intent_matcher = IntentMatcher.from_file()
+
+# Monte Carlo portfolio projections
+PROJECTION_PATHS = int(os.environ.get('PROJECTION_PATHS', 2000))
+PROJECTION_SEED = int(os.environ.get('PROJECTION_SEED', 42))
+PROJECTION_MAX_YEARS = 50
+
+# Local daily price history
+PRICE_STORE_DIR = os.environ.get('PRICE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prices'))
+PRICE_CSV_DIR = os.environ.get('PRICE_CSV_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'csv'))
+
+price_store = PriceStore(PRICE_STORE_DIR)
+
+# Portfolio risk analytics over the price store
+RISK_LOOKBACK_DAYS = int(os.environ.get('RISK_LOOKBACK_DAYS', 3 * 365))
+
+# Efficient frontier batch job: recomputed on the lease holder, read by every worker
+FRONTIER_REFRESH_INTERVAL = float(os.environ.get('FRONTIER_REFRESH_INTERVAL', 24 * 60 * 60))
+FRONTIER_POLL_INTERVAL = float(os.environ.get('FRONTIER_POLL_INTERVAL', 5 * 60))
+FRONTIER_ID = 'latest'
+
+frontier_table = None  # {'computed_at', 'window', 'frontiers', 'allocations': {score: allocation}}
+
+# Historical SIP backtests
+BACKTEST_LOOKBACK_DAYS = int(os.environ.get('BACKTEST_LOOKBACK_DAYS', 20 * 365))
+BACKTEST_MAX_ALLOCATIONS = int(os.environ.get('BACKTEST_MAX_ALLOCATIONS', 100))
+
+# User-base stress tests: chunks streamed from Mongo, a process pool for big runs
+STRESS_CHUNK_SIZE = int(os.environ.get('STRESS_CHUNK_SIZE', 50000))
+STRESS_PROCESS_WORKERS = int(os.environ.get('STRESS_PROCESS_WORKERS', os.cpu_count() or 1))
+STRESS_PROCESS_THRESHOLD = int(os.environ.get('STRESS_PROCESS_THRESHOLD', 200000))
+
+stress_tasks = set()
+
+# What-if scenario comparisons
+SCENARIO_MAX_VARIANTS = int(os.environ.get('SCENARIO_MAX_VARIANTS', 50))
+
+RISK_BATCH_MAX_PROFILES = int(os.environ.get('RISK_BATCH_MAX_PROFILES', 100000))
+
 # Pydantic Models
 class UserProfile(BaseModel):
     user_id: str = None
@@ -65,6 +305,45 @@ class ChatMessage(BaseModel):
     message: str
     user_context: Optional[Dict[str, Any]] = None
 
+class ScenarioVariant(BaseModel):
+    name: Optional[str] = None
+    allocation: Optional[Dict[str, float]] = None  # defaults to the current allocation
+    monthly_contribution: Optional[float] = None  # defaults to the current monthly investment
+
+class ScenarioRequest(BaseModel):
+    variants: List[ScenarioVariant]
+    portfolio_value: float = 0
+    horizons: List[int] = [1, 5, 10, 20]
+    seed: Optional[int] = None
+
+class StressScenario(BaseModel):
+    shocks: Dict[str, float] = {}  # instantaneous return per bucket, e.g. -0.3 for a 30% fall
+    rate_change_bps: float = 0
+
+class StressTestRequest(BaseModel):
+    scenarios: Dict[str, StressScenario] = {}
+    presets: List[str] = []  # names from PRESET_SCENARIOS; all of them if no scenarios are given
+
+class FinancialGoal(BaseModel):
+    name: str
+    target_amount: float  # in today's rupees
+    target_date: date
+    priority: int = 1  # 1 is the most important
+    current_savings: float = 0
+
+class GoalPlanRequest(BaseModel):
+    goals: List[FinancialGoal]
+    user_id: Optional[str] = None  # fills in risk category and budget from stored data
+    risk_category: Optional[str] = None
+    monthly_budget: Optional[float] = None
+    inflation: float = Field(0.06, ge=0, le=0.5)  # annual, as a fraction
+
+class BacktestRequest(BaseModel):
+    allocations: List[Dict[str, float]]
+    years: int = 5
+    monthly_contribution: float = 10000
+    rebalance_months: int = 12
+
 # Indian Market Data - Top stocks and mutual funds
 INDIAN_STOCKS = {
     'large_cap': ['RELIANCE.BSE', 'TCS.BSE', 'HDFCBANK.BSE', 'ICICIBANK.BSE', 'INFY.BSE'],
@@ -82,6 +361,40 @@ MUTUAL_FUNDS = {
     'hybrid': ['SBI Equity Hybrid Fund', 'HDFC Balanced Advantage Fund']
 }
 
+# Fallback allocations per risk category, used until the efficient frontier job has run
+DEFAULT_ALLOCATIONS = {
+    'High Risk': {
+        'equity_large_cap': 35,
+        'equity_mid_cap': 25,
+        'equity_small_cap': 15,
+        'mutual_funds_equity': 15,
+        'debt_funds': 5,
+        'emergency_buffer': 5
+    },
+    'Moderate Risk': {
+        'equity_large_cap': 30,
+        'equity_mid_cap': 15,
+        'mutual_funds_equity': 25,
+        'debt_funds': 20,
+        'emergency_buffer': 10
+    },
+    'Low Risk': {
+        'equity_large_cap': 20,
+        'mutual_funds_equity': 15,
+        'debt_funds': 45,
+        'emergency_buffer': 20
+    }
+}
+
+# Priced instruments standing in for each allocation bucket in the risk analytics.
+# Equity funds track the Nifty; debt and the emergency buffer have no price history.
+BUCKET_PROXIES = {
+    'equity_large_cap': INDIAN_STOCKS['large_cap'],
+    'equity_mid_cap': INDIAN_STOCKS['mid_cap'],
+    'equity_small_cap': INDIAN_STOCKS['small_cap'],
+    'mutual_funds_equity': [NIFTY_SYMBOL],
+}
+
 @app.get("/")
 async def root():
     return {"message": "AI Financial Advisor API is running"}
@@ -94,8 +407,11 @@ async def create_user_profile(profile: UserProfile):
         
         profile_dict = profile.dict()
         await db.user_profiles.insert_one(profile_dict)
+        await refresh_dashboard(dashboards.set_profile, profile_dict)
         
         return {"status": "success", "user_id": profile.user_id, "message": "Profile created successfully"}
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A profile with this user_id already exists")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -112,167 +428,620 @@ async def get_user_profile(user_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def score_risk(profile: UserProfile):
+    """The risk questionnaire behind /api/risk-assessment, without saving anything"""
+    # Advanced Risk Assessment Algorithm
+    risk_factors = {}
+    total_score = 0
+    
+    # Age factor (0-25 points)
+    if profile.age < 25:
+        age_score = 25
+    elif profile.age < 35:
+        age_score = 20
+    elif profile.age < 45:
+        age_score = 15
+    elif profile.age < 55:
+        age_score = 10
+    else:
+        age_score = 5
+    
+    risk_factors['age'] = age_score
+    total_score += age_score
+    
+    # Income vs Expenses ratio (0-20 points)
+    disposable_income = profile.monthly_income - profile.monthly_expenses
+    income_ratio = disposable_income / profile.monthly_income if profile.monthly_income > 0 else 0
+    
+    if income_ratio > 0.5:
+        income_score = 20
+    elif income_ratio > 0.3:
+        income_score = 15
+    elif income_ratio > 0.2:
+        income_score = 10
+    elif income_ratio > 0.1:
+        income_score = 5
+    else:
+        income_score = 0
+        
+    risk_factors['income_ratio'] = income_score
+    total_score += income_score
+    
+    # Investment experience (0-20 points)
+    experience_scores = {
+        'beginner': 5,
+        'intermediate': 12,
+        'experienced': 20
+    }
+    exp_score = experience_scores.get(profile.investment_experience.lower(), 5)
+    risk_factors['experience'] = exp_score
+    total_score += exp_score
+    
+    # Investment horizon (0-15 points)
+    horizon_scores = {
+        'short': 5,
+        'medium': 10,
+        'long': 15
+    }
+    horizon_score = horizon_scores.get(profile.investment_horizon.lower(), 5)
+    risk_factors['horizon'] = horizon_score
+    total_score += horizon_score
+    
+    # Emergency fund adequacy (0-10 points)
+    emergency_months = profile.emergency_fund / profile.monthly_expenses if profile.monthly_expenses > 0 else 0
+    if emergency_months >= 6:
+        emergency_score = 10
+    elif emergency_months >= 3:
+        emergency_score = 7
+    elif emergency_months >= 1:
+        emergency_score = 4
+    else:
+        emergency_score = 0
+        
+    risk_factors['emergency_fund'] = emergency_score
+    total_score += emergency_score
+    
+    # Determine risk category
+    if total_score >= 70:
+        risk_category = "High Risk"
+    elif total_score >= 45:
+        risk_category = "Moderate Risk"
+    else:
+        risk_category = "Low Risk"
+    
+    risk_assessment = RiskAssessment(
+        user_id=profile.user_id,
+        risk_score=total_score,
+        risk_category=risk_category,
+        assessment_factors=risk_factors
+    )
+    
+    return risk_assessment
+
 @app.post("/api/risk-assessment")
 async def assess_risk(profile: UserProfile):
     try:
-        # Advanced Risk Assessment Algorithm
-        risk_factors = {}
-        total_score = 0
-        
-        # Age factor (0-25 points)
-        if profile.age < 25:
-            age_score = 25
-        elif profile.age < 35:
-            age_score = 20
-        elif profile.age < 45:
-            age_score = 15
-        elif profile.age < 55:
-            age_score = 10
-        else:
-            age_score = 5
-        
-        risk_factors['age'] = age_score
-        total_score += age_score
-        
-        # Income vs Expenses ratio (0-20 points)
-        disposable_income = profile.monthly_income - profile.monthly_expenses
-        income_ratio = disposable_income / profile.monthly_income if profile.monthly_income > 0 else 0
-        
-        if income_ratio > 0.5:
-            income_score = 20
-        elif income_ratio > 0.3:
-            income_score = 15
-        elif income_ratio > 0.2:
-            income_score = 10
-        elif income_ratio > 0.1:
-            income_score = 5
-        else:
-            income_score = 0
-            
-        risk_factors['income_ratio'] = income_score
-        total_score += income_score
-        
-        # Investment experience (0-20 points)
-        experience_scores = {
-            'beginner': 5,
-            'intermediate': 12,
-            'experienced': 20
-        }
-        exp_score = experience_scores.get(profile.investment_experience.lower(), 5)
-        risk_factors['experience'] = exp_score
-        total_score += exp_score
-        
-        # Investment horizon (0-15 points)
-        horizon_scores = {
-            'short': 5,
-            'medium': 10,
-            'long': 15
-        }
-        horizon_score = horizon_scores.get(profile.investment_horizon.lower(), 5)
-        risk_factors['horizon'] = horizon_score
-        total_score += horizon_score
-        
-        # Emergency fund adequacy (0-10 points)
-        emergency_months = profile.emergency_fund / profile.monthly_expenses if profile.monthly_expenses > 0 else 0
-        if emergency_months >= 6:
-            emergency_score = 10
-        elif emergency_months >= 3:
-            emergency_score = 7
-        elif emergency_months >= 1:
-            emergency_score = 4
-        else:
-            emergency_score = 0
-            
-        risk_factors['emergency_fund'] = emergency_score
-        total_score += emergency_score
-        
-        # Determine risk category
-        if total_score >= 70:
-            risk_category = "High Risk"
-        elif total_score >= 45:
-            risk_category = "Moderate Risk"
-        else:
-            risk_category = "Low Risk"
-        
-        risk_assessment = RiskAssessment(
-            user_id=profile.user_id,
-            risk_score=total_score,
-            risk_category=risk_category,
-            assessment_factors=risk_factors
-        )
+        risk_assessment = score_risk(profile)
         
         # Save to database
-        await db.risk_assessments.insert_one(risk_assessment.dict())
+        assessment_record = {**risk_assessment.dict(), "timestamp": datetime.now()}
+        await db.risk_assessments.insert_one(assessment_record)
+        await refresh_dashboard(dashboards.set_risk_assessment, assessment_record)
         
         return risk_assessment.dict()
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def parse_profile_batch(body, content_type):
+    """Parse a JSON array or NDJSON body (one profile per line) into UserProfile objects"""
+    try:
+        if 'ndjson' in content_type:
+            records = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            records = json.loads(body)
+    except ValueError as parse_error:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {parse_error}")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON of profiles")
+    if len(records) > RISK_BATCH_MAX_PROFILES:
+        raise HTTPException(status_code=400, detail=f"At most {RISK_BATCH_MAX_PROFILES} profiles per batch")
+    
+    profiles = []
+    for index, record in enumerate(records):
+        try:
+            profile = UserProfile(**record) if isinstance(record, dict) else None
+        except ValidationError as validation_error:
+            raise HTTPException(status_code=400, detail=f"Profile {index}: {validation_error.errors(include_url=False, include_context=False)}")
+        if profile is None or not profile.user_id:
+            raise HTTPException(status_code=400, detail=f"Profile {index}: user_id is required")
+        profiles.append(profile)
+    return profiles
+
+def score_profile_batch(body, content_type):
+    return assessment_dicts(parse_profile_batch(body, content_type))
+
+@app.post("/api/risk-assessment/batch")
+async def assess_risk_batch(request: Request):
+    """Score many profiles at once; each result is identical to what /api/risk-assessment returns"""
+    try:
+        body = await request.body()
+        # Parsing, validating and scoring a large batch takes seconds of CPU: keep it off the event loop
+        assessments = await run_in_threadpool(score_profile_batch, body, request.headers.get('content-type', ''))
+        
+        # One round-trip for the whole batch; unordered lets the server parallelize
+        if assessments:
+            assessed_at = datetime.now()
+            assessment_records = [{**assessment, "timestamp": assessed_at} for assessment in assessments]
+            await db.risk_assessments.insert_many(assessment_records, ordered=False)
+            await refresh_dashboard(dashboards.set_risk_assessments, assessment_records)
+        
+        return {
+            "count": len(assessments),
+            "categories": dict(Counter(assessment['risk_category'] for assessment in assessments)),
+            "assessments": assessments
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class QuoteBudgetExhausted(Exception):
+    pass
+
+async def fetch_global_quote(symbol, budget_acquired=False):
+    """Fetch a single GLOBAL_QUOTE from Alpha Vantage, sharing one request among concurrent callers"""
+    return await quote_flights.do(symbol, lambda: request_global_quote(symbol, budget_acquired))
+
+async def request_global_quote(symbol, budget_acquired=False):
+    """Fetch a single GLOBAL_QUOTE from Alpha Vantage without blocking the event loop"""
+    if not budget_acquired and not await quote_scheduler.acquire():
+        raise QuoteBudgetExhausted(f"Alpha Vantage call budget exhausted, not fetching {symbol}")
+    params = {'function': 'GLOBAL_QUOTE', 'symbol': symbol, 'apikey': ALPHA_VANTAGE_KEY}
+    async with quote_semaphore:
+        response = await asyncio.wait_for(get_http_client().get(ALPHA_VANTAGE_URL, params=params), timeout=QUOTE_FETCH_TIMEOUT)
+    if response.status_code != 200:
+        return None
+    quote = response.json().get('Global Quote')
+    # Unknown or unsupported symbols come back as an empty Global Quote: that's no quote, not a zero price
+    if not quote or not quote.get('05. price'):
+        return None
+    return quote
+
+def mock_stock_quote(stock):
+    """Deterministic-per-process placeholder used when the upstream call fails"""
+    return {
+        'symbol': stock,
+        'price': 1000 + (hash(stock) % 500),
+        'change': (hash(stock) % 20) - 10,
+        'change_percent': f"{((hash(stock) % 20) - 10) / 10:.2f}%",
+        'volume': hash(stock) % 100000
+    }
+
+async def load_stock_quote(stock, budget_acquired=False):
+    quote = await fetch_global_quote(stock, budget_acquired)
+    if quote is None:
+        return None
+    return {
+        'symbol': stock,
+        'price': float(quote.get('05. price', 0)),
+        'change': float(quote.get('09. change', 0)),
+        'change_percent': quote.get('10. change percent', '0%'),
+        'volume': int(quote.get('06. volume', 0))
+    }
+
+async def load_nifty_quote(symbol, budget_acquired=False):
+    quote = await fetch_global_quote(symbol, budget_acquired)
+    if quote is None:
+        return None
+    return {
+        'price': float(quote.get('05. price', 18500)),
+        'change': float(quote.get('09. change', 0)),
+        'change_percent': quote.get('10. change percent', '0%')
+    }
+
+def quote_loader(symbol):
+    return load_nifty_quote if symbol == NIFTY_SYMBOL else load_stock_quote
+
+def all_stock_symbols():
+    return [stock for stocks in INDIAN_STOCKS.values() for stock in stocks]
+
+# Symbols the background refresher keeps warm; demand is only worth counting for these
+QUOTE_REFRESH_SYMBOLS = frozenset([NIFTY_SYMBOL, *all_stock_symbols()])
+# Bulk lookups of other symbols must never evict these from the quote cache
+quote_cache.pin(QUOTE_REFRESH_SYMBOLS)
+
+async def fetch_quote_result(symbol):
+    """Quote for one symbol, tagged with where it came from: fresh, cached, stale, mock or error"""
+    if symbol in QUOTE_REFRESH_SYMBOLS:
+        quote_scheduler.record_demand(symbol)
+    entry = quote_cache.peek(symbol)
+    if entry is None:
+        status = 'fresh'
+    elif quote_cache.is_fresh(entry[1]):
+        status = 'cached'
+    else:
+        status = 'stale'  # Served as-is while the cache revalidates it in the background
+    
+    try:
+        value, cached_at = await quote_cache.get_or_fetch(symbol, quote_loader(symbol))
+    except QuoteBudgetExhausted:
+        mock = dict(NIFTY_FALLBACK) if symbol == NIFTY_SYMBOL else mock_stock_quote(symbol)
+        return {'symbol': symbol, 'status': 'mock', 'quote': mock}
+    except Exception as quote_error:
+        return {'symbol': symbol, 'status': 'error', 'detail': f"{type(quote_error).__name__}: {quote_error}"}
+    
+    if value is None:
+        return {'symbol': symbol, 'status': 'error', 'detail': 'No quote returned by upstream'}
+    return {
+        'symbol': symbol,
+        'status': status,
+        'quote': value,
+        'cached_at': datetime.fromtimestamp(cached_at).isoformat(),
+        'age_seconds': round(time.time() - cached_at, 1)
+    }
+
+def build_market_snapshot():
+    """Assemble the market data view from the quote cache, without any upstream I/O"""
+    def cached(symbol, fallback):
+        entry = quote_cache.peek(symbol)
+        if entry is None:
+            return fallback
+        value, cached_at = entry
+        return {**value, 'cached_at': datetime.fromtimestamp(cached_at).isoformat()}
+
+    market_data = {}
+    for category, stocks in INDIAN_STOCKS.items():
+        market_data[category] = [cached(stock, mock_stock_quote(stock)) for stock in stocks]
+    market_data['nifty50'] = cached(NIFTY_SYMBOL, dict(NIFTY_FALLBACK))
+    return market_data
+
+def seed_quote_cache(market_data):
+    """Warm the quote cache from a persisted snapshot so a restart doesn't re-spend the budget"""
+    snapshot_quotes = [
+        (quote['symbol'], quote)
+        for category, quotes in market_data.items() if category != 'nifty50'
+        for quote in quotes
+    ]
+    snapshot_quotes.append((NIFTY_SYMBOL, market_data['nifty50']))
+    
+    for symbol, quote in snapshot_quotes:
+        if 'cached_at' not in quote:
+            continue  # Mock placeholder, nothing real to cache
+        cached_at = datetime.fromisoformat(quote['cached_at']).timestamp()
+        entry = quote_cache.peek(symbol)
+        if entry is None or entry[1] < cached_at:
+            value = {key: val for key, val in quote.items() if key != 'cached_at'}
+            quote_cache.set(symbol, value, cached_at=cached_at)
+
+def quotes_by_symbol(market_data):
+    quotes = {
+        quote['symbol']: quote
+        for category, category_quotes in market_data.items() if category != 'nifty50'
+        for quote in category_quotes
+    }
+    quotes[NIFTY_SYMBOL] = {**market_data['nifty50'], 'symbol': NIFTY_SYMBOL}
+    return quotes
+
+def publish_snapshot(market_data):
+    quote_broadcaster.publish(quotes_by_symbol(market_data))
+
+def stamp_quote_ages(quotes):
+    now = time.time()
+    stamped = []
+    for quote in quotes:
+        if 'cached_at' in quote:
+            quote = {**quote, 'age_seconds': round(now - datetime.fromisoformat(quote['cached_at']).timestamp(), 1)}
+        stamped.append(quote)
+    return stamped
+
 @app.get("/api/market-data")
 async def get_market_data():
     try:
+        # Served entirely from the latest snapshot; the poller does all upstream I/O
+        if snapshot_store.latest is not None:
+            snapshot = snapshot_store.latest['market_data']
+        else:
+            snapshot = build_market_snapshot()
+        
         market_data = {}
+        for category, quotes in snapshot.items():
+            if category == 'nifty50':
+                market_data[category] = stamp_quote_ages([quotes])[0]
+            else:
+                market_data[category] = stamp_quote_ages(quotes)
         
-        # Get data for top Indian stocks
-        for category, stocks in INDIAN_STOCKS.items():
-            market_data[category] = []
-            for stock in stocks[:2]:  # Limit to 2 stocks per category to avoid API limits
-                try:
-                    # Alpha Vantage API call for Indian stocks
-                    symbol = stock.replace('.BSE', '.BSE')
-                    url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={ALPHA_VANTAGE_KEY}"
-                    response = requests.get(url, timeout=10)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        if 'Global Quote' in data:
-                            quote = data['Global Quote']
-                            stock_data = {
-                                'symbol': stock,
-                                'price': float(quote.get('05. price', 0)),
-                                'change': float(quote.get('09. change', 0)),
-                                'change_percent': quote.get('10. change percent', '0%'),
-                                'volume': int(quote.get('06. volume', 0))
-                            }
-                            market_data[category].append(stock_data)
-                except Exception as stock_error:
-                    print(f"Error fetching data for {stock}: {stock_error}")
-                    # Add mock data if API fails
-                    market_data[category].append({
-                        'symbol': stock,
-                        'price': 1000 + (hash(stock) % 500),
-                        'change': (hash(stock) % 20) - 10,
-                        'change_percent': f"{((hash(stock) % 20) - 10) / 10:.2f}%",
-                        'volume': hash(stock) % 100000
-                    })
-        
-        # Add Nifty 50 index data
+        return market_data
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/quotes")
+async def get_bulk_quotes(symbols: str):
+    try:
+        requested = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols.split(',') if symbol.strip()))
+        if not requested:
+            raise HTTPException(status_code=400, detail="No symbols given")
+        if len(requested) > BULK_QUOTE_MAX_SYMBOLS:
+            raise HTTPException(status_code=400, detail=f"At most {BULK_QUOTE_MAX_SYMBOLS} symbols per request")
+        
+        tasks = {
+            symbol: asyncio.ensure_future(fetch_quote_result(symbol))
+            for symbol in requested if QUOTE_SYMBOL_PATTERN.match(symbol)
+        }
+        # Answer with whatever is ready by the deadline; unfinished fetches keep
+        # running and land in the cache for the next call
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=BULK_QUOTE_DEADLINE)
+        
+        results = []
+        for symbol in requested:
+            task = tasks.get(symbol)
+            if task is None:
+                results.append({'symbol': symbol, 'status': 'error', 'detail': 'Invalid symbol'})
+            elif not task.done():
+                results.append({'symbol': symbol, 'status': 'error', 'detail': 'Upstream still fetching, retry shortly'})
+            else:
+                results.append(task.result())
+        
+        return {
+            "quotes": results,
+            "counts": dict(Counter(result['status'] for result in results))
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/market-data/budget")
+async def get_market_data_budget():
+    return {
+        "alpha_vantage": quote_scheduler.budget(),
+        "quote_cache": quote_cache.stats(),
+        "in_flight": quote_flights.stats(),
+        "quote_stream": quote_broadcaster.stats()
+    }
+
+async def refresh_quotes_forever():
+    """Keep the quote cache warm for the whole universe within the API key's call budget"""
+    def last_refreshed(symbol):
+        entry = quote_cache.peek(symbol)
+        return entry[1] if entry else None
+
+    while True:
+        if not snapshot_store.is_leader:
+            # Another worker owns the upstream budget
+            await asyncio.sleep(QUOTE_REFRESH_INTERVAL)
+            continue
+        for symbol in quote_scheduler.refresh_order(all_stock_symbols(), last_refreshed):
+            entry = quote_cache.peek(symbol)
+            if entry is not None and quote_cache.is_fresh(entry[1]):
+                continue
+            # Wait for budget outside the single-flight call so request-path
+            # callers never queue behind the rate limiter
+            if not await quote_scheduler.acquire(wait=True):
+                break  # Daily budget spent; retry after the bucket refills
+            try:
+                value = await quote_loader(symbol)(symbol, budget_acquired=True)
+                if value is not None:
+                    quote_cache.set(symbol, value)
+            except Exception as refresh_error:
+                print(f"Scheduled refresh failed for {symbol}: {refresh_error!r}")
+        await asyncio.sleep(QUOTE_REFRESH_INTERVAL)
+
+async def poll_market_snapshots_forever():
+    """Publish a market snapshot every interval from the lease holder; other workers follow it"""
+    while True:
+        try:
+            if await snapshot_store.claim_lease():
+                await snapshot_store.save(build_market_snapshot())
+            elif await snapshot_store.load_latest():
+                seed_quote_cache(snapshot_store.latest['market_data'])
+            if snapshot_store.latest is not None:
+                publish_snapshot(snapshot_store.latest['market_data'])
+        except Exception as poll_error:
+            print(f"Market snapshot poll failed: {poll_error!r}")
+        await asyncio.sleep(MARKET_SNAPSHOT_INTERVAL)
+
+quote_refresher = None
+snapshot_poller = None
+frontier_builder = None
+
+@app.on_event("startup")
+async def start_market_data_tasks():
+    global quote_refresher, snapshot_poller, frontier_builder
+    try:
+        await snapshot_store.ensure_indexes()
+        # Serve the last persisted snapshot straight away after a restart
+        if await snapshot_store.load_latest():
+            seed_quote_cache(snapshot_store.latest['market_data'])
+            publish_snapshot(snapshot_store.latest['market_data'])
+    except Exception as snapshot_error:
+        print(f"Could not load last market snapshot: {snapshot_error!r}")
+    quote_refresher = asyncio.create_task(refresh_quotes_forever())
+    snapshot_poller = asyncio.create_task(poll_market_snapshots_forever())
+    frontier_builder = asyncio.create_task(rebuild_frontier_forever())
+
+@app.on_event("shutdown")
+async def stop_market_data_tasks():
+    for task in (quote_refresher, snapshot_poller, frontier_builder):
+        if task is not None:
+            task.cancel()
+    try:
+        await snapshot_store.release_lease()
+    except Exception as lease_error:
+        print(f"Could not release market snapshot lease: {lease_error!r}")
+
+def resolve_stream_symbols(message):
+    """Expand a subscribe/unsubscribe message's symbols and categories into known symbols.
+
+    Returns None when either field is not a list of strings.
+    """
+    requested = {}
+    for field in ('symbols', 'categories'):
+        values = message.get(field) or []
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            return None
+        requested[field] = values
+    known = set(all_stock_symbols()) | {NIFTY_SYMBOL}
+    symbols = set(requested['symbols'])
+    for category in requested['categories']:
+        if category == 'nifty50':
+            symbols.add(NIFTY_SYMBOL)
+        else:
+            symbols.update(INDIAN_STOCKS.get(category, []))
+    return symbols & known, sorted(symbols - known)
+
+async def send_stream_messages(websocket, subscriber):
+    try:
+        while True:
+            message = await subscriber.queue.get()
+            if message is DROP:
+                break
+            await asyncio.wait_for(websocket.send_json(message), timeout=QUOTE_STREAM_SEND_TIMEOUT)
+    except Exception:
+        # A send timed out or the socket is already gone; the close below is best-effort either way
+        pass
+    # Too slow to keep up (or unreachable): stop broadcasting to it and hang up
+    quote_broadcaster.disconnect(subscriber)
+    try:
+        await asyncio.wait_for(
+            websocket.close(code=1013, reason="Client too slow, reconnect to resubscribe"),
+            timeout=QUOTE_STREAM_SEND_TIMEOUT
+        )
+    except Exception:
+        pass
+
+@app.websocket("/api/ws/quotes")
+async def quotes_websocket(websocket: WebSocket):
+    """Live quotes: send {"action": "subscribe"|"unsubscribe", "symbols": [...], "categories": [...]}"""
+    await websocket.accept()
+    subscriber = quote_broadcaster.connect()
+    sender = asyncio.create_task(send_stream_messages(websocket, subscriber))
+    try:
+        while True:
+            message = await websocket.receive_json()
+            action = message.get('action') if isinstance(message, dict) else None
+            if action not in ('subscribe', 'unsubscribe'):
+                subscriber.offer({'type': 'error', 'detail': "action must be 'subscribe' or 'unsubscribe'"})
+                continue
+            resolved = resolve_stream_symbols(message)
+            if resolved is None:
+                subscriber.offer({'type': 'error', 'detail': "symbols and categories must be lists of strings"})
+                continue
+            symbols, unknown = resolved
+            if action == 'subscribe':
+                quote_broadcaster.subscribe(subscriber, symbols)
+            else:
+                quote_broadcaster.unsubscribe(subscriber, symbols)
+            subscriber.offer({'type': action + 'd', 'symbols': sorted(subscriber.symbols), 'unknown': unknown})
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        quote_broadcaster.disconnect(subscriber)
+        sender.cancel()
+
+async def fetch_daily_series(symbol, outputsize):
+    if not await quote_scheduler.acquire(wait=True):
+        raise QuoteBudgetExhausted(f"Alpha Vantage call budget exhausted, not fetching history for {symbol}")
+    params = {'function': 'TIME_SERIES_DAILY', 'symbol': symbol, 'outputsize': outputsize, 'apikey': ALPHA_VANTAGE_KEY}
+    async with quote_semaphore:
+        response = await asyncio.wait_for(get_http_client().get(ALPHA_VANTAGE_URL, params=params), timeout=QUOTE_FETCH_TIMEOUT)
+    response.raise_for_status()
+    return parse_daily_series(response.json())
+
+async def ingest_daily_prices(symbols):
+    """Append new daily bars from Alpha Vantage for each symbol, within the call budget"""
+    results = {}
+    today = np.datetime64('today', 'D')
+    for symbol in symbols:
+        last = price_store.last_date(symbol)
+        # 'compact' returns the latest 100 trading days, enough to top up a recent store
+        outputsize = 'compact' if last is not None and today - last < np.timedelta64(130, 'D') else 'full'
         try:
-            nifty_url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol=NSEI&apikey={ALPHA_VANTAGE_KEY}"
-            nifty_response = requests.get(nifty_url, timeout=10)
-            if nifty_response.status_code == 200:
-                nifty_data = nifty_response.json()
-                if 'Global Quote' in nifty_data:
-                    quote = nifty_data['Global Quote']
-                    market_data['nifty50'] = {
-                        'price': float(quote.get('05. price', 18500)),
-                        'change': float(quote.get('09. change', 0)),
-                        'change_percent': quote.get('10. change percent', '0%')
-                    }
-        except:
-            market_data['nifty50'] = {'price': 18500, 'change': 45.2, 'change_percent': '0.24%'}
+            records = await fetch_daily_series(symbol, outputsize)
+            results[symbol] = {'appended': price_store.append(symbol, records)}
+        except QuoteBudgetExhausted as budget_error:
+            results[symbol] = {'error': str(budget_error)}
+            break
+        except Exception as ingest_error:
+            results[symbol] = {'error': f"{type(ingest_error).__name__}: {ingest_error}"}
+    return results
+
+price_ingestion = {'task': None, 'source': None, 'started_at': None, 'finished_at': None, 'results': None}
+
+async def run_price_ingestion(source):
+    try:
+        symbols = all_stock_symbols() + [NIFTY_SYMBOL]
+        if source == 'csv':
+            results = await run_in_threadpool(ingest_csv_dir, price_store, PRICE_CSV_DIR, set(symbols))
+        else:
+            results = await ingest_daily_prices(symbols)
+    except Exception as ingest_error:
+        results = {'error': f"{type(ingest_error).__name__}: {ingest_error}"}
+    price_ingestion.update(results=results, finished_at=datetime.now())
+
+@app.post("/api/prices/ingest")
+async def start_price_ingestion(source: str = "alpha_vantage"):
+    """Top up local price history for INDIAN_STOCKS and the Nifty, from Alpha Vantage or PRICE_CSV_DIR"""
+    if source not in ('alpha_vantage', 'csv'):
+        raise HTTPException(status_code=400, detail="source must be 'alpha_vantage' or 'csv'")
+    if price_ingestion['task'] is not None and not price_ingestion['task'].done():
+        raise HTTPException(status_code=409, detail="Price ingestion already running")
+    price_ingestion.update(
+        task=asyncio.create_task(run_price_ingestion(source)),
+        source=source,
+        started_at=datetime.now(),
+        finished_at=None,
+        results=None
+    )
+    return {"status": "started", "source": source}
+
+@app.get("/api/prices/status")
+async def get_price_store_status():
+    return {
+        "ingestion": {key: value for key, value in price_ingestion.items() if key != 'task'},
+        "symbols": [price_store.info(symbol) for symbol in price_store.symbols()]
+    }
+
+@app.get("/api/prices/{symbol}")
+async def get_price_history(symbol: str, start: Optional[str] = None, end: Optional[str] = None):
+    try:
+        try:
+            prices = price_store.read(symbol.upper(), start, end)
+        except ValueError as range_error:
+            raise HTTPException(status_code=400, detail=str(range_error))
+        if not len(prices):
+            raise HTTPException(status_code=404, detail="No price history for this symbol and range")
         
-        return market_data
+        def json_values(values):
+            # Blank CSV fields are stored as NaN, which JSON can't carry
+            return [value if np.isfinite(value) else None for value in values.tolist()]
         
+        return {
+            "symbol": symbol.upper(),
+            "dates": prices['date'].astype(str).tolist(),
+            **{field: json_values(prices[field]) for field in ('open', 'high', 'low', 'close', 'volume')}
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/recommendations")
 async def get_investment_recommendations(profile: UserProfile):
     try:
+        # Same scoring inputs and allocation table as the stored recommendation: reuse it, no LLM call
+        content_hash = profile_hash(profile.dict(), frontier_table['computed_at'] if frontier_table else None)
+        # Only a known user has a stored recommendation to reuse; anonymous requests are never cached
+        cached = await recommendation_store.get(profile.user_id, content_hash) if profile.user_id else None
+        if cached is not None:
+            return {**InvestmentRecommendation(**cached).dict(), "cached": True}
+        
         # Get risk assessment
-        risk_assessment = await db.risk_assessments.find_one({"user_id": profile.user_id})
+        risk_assessment = await db.risk_assessments.find_one({"user_id": profile.user_id}, sort=[("timestamp", -1)])
         if not risk_assessment:
             # Create risk assessment if not exists
             risk_data = await assess_risk(profile)
@@ -285,31 +1054,8 @@ async def get_investment_recommendations(profile: UserProfile):
         # Calculate investment capacity
         monthly_investable = profile.monthly_income - profile.monthly_expenses
         
-        # Asset allocation based on risk profile
-        if risk_category == "High Risk":
-            allocation = {
-                'equity_large_cap': 35,
-                'equity_mid_cap': 25,
-                'equity_small_cap': 15,
-                'mutual_funds_equity': 15,
-                'debt_funds': 5,
-                'emergency_buffer': 5
-            }
-        elif risk_category == "Moderate Risk":
-            allocation = {
-                'equity_large_cap': 30,
-                'equity_mid_cap': 15,
-                'mutual_funds_equity': 25,
-                'debt_funds': 20,
-                'emergency_buffer': 10
-            }
-        else:  # Low Risk
-            allocation = {
-                'equity_large_cap': 20,
-                'mutual_funds_equity': 15,
-                'debt_funds': 45,
-                'emergency_buffer': 20
-            }
+        # Asset allocation: precomputed frontier portfolio for this score, else the category default
+        allocation = dict(frontier_allocation(risk_score) or DEFAULT_ALLOCATIONS.get(risk_category, DEFAULT_ALLOCATIONS['Low Risk']))
         
         # Generate specific recommendations
         recommendations = []
@@ -333,6 +1079,15 @@ async def get_investment_recommendations(profile: UserProfile):
                 'rationale': 'Growth-oriented mid-cap stocks for higher returns'
             })
         
+        if allocation.get('equity_small_cap', 0) > 0:
+            recommendations.append({
+                'type': 'Small Cap Stocks',
+                'allocation_percent': allocation['equity_small_cap'],
+                'amount': (monthly_investable * allocation['equity_small_cap'] / 100),
+                'instruments': INDIAN_STOCKS['small_cap'][:2],
+                'rationale': 'High-growth small-cap stocks for a small, long-horizon slice of the portfolio'
+            })
+        
         # Mutual fund recommendations
         if allocation.get('mutual_funds_equity', 0) > 0:
             recommendations.append({
@@ -367,17 +1122,11 @@ async def get_investment_recommendations(profile: UserProfile):
         """
         
         try:
-            openai_response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a financial advisor specializing in Indian markets. Provide concise, practical investment advice."},
-                    {"role": "user", "content": reasoning_prompt}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
-            ai_reasoning = openai_response.choices[0].message.content
-        except:
+            ai_reasoning = await llm_client.complete([
+                {"role": "system", "content": "You are a financial advisor specializing in Indian markets. Provide concise, practical investment advice."},
+                {"role": "user", "content": reasoning_prompt}
+            ])
+        except Exception:
             ai_reasoning = f"Based on your {risk_category.lower()} profile and investment goals, this allocation balances growth potential with risk management. The diversified approach across large-cap stocks and mutual funds aligns with your investment experience and time horizon."
         
         investment_recommendation = InvestmentRecommendation(
@@ -388,22 +1137,49 @@ async def get_investment_recommendations(profile: UserProfile):
             timestamp=datetime.now()
         )
         
-        # Save to database
-        await db.investment_recommendations.insert_one(investment_recommendation.dict())
+        # Save to database: replace the user's current recommendation, which is also the cache entry
+        recommendation_record = {**investment_recommendation.dict(), "risk_category": risk_category, "profile_hash": content_hash}
+        if profile.user_id:
+            await recommendation_store.save(recommendation_record)
+            projections = await run_in_threadpool(dashboard_projections, allocation, monthly_investable)
+            await refresh_dashboard(dashboards.set_recommendation, recommendation_record, projections)
         
-        return investment_recommendation.dict()
+        return {**investment_recommendation.dict(), "cached": False}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def chat_context(chat_message):
+    # Get user context for personalized advice
+    user_context = chat_message.user_context or {}
+    user_age = user_context.get('age', 30)
+    user_income = user_context.get('income', 50000)
+    risk_category = user_context.get('risk_category', 'Moderate Risk')
+    return user_age, user_income, risk_category
+
+def chat_llm_messages(chat_message, user_age, user_income, risk_category):
+    return [
+        {"role": "system", "content": "You are an AI Financial Advisor specializing in Indian markets. Provide helpful, accurate financial advice. Keep responses concise (2-3 sentences)."},
+        {"role": "user", "content": f"{chat_message.message}\nUser: {user_age} years old, ₹{user_income} income, {risk_category}"}
+    ]
+
+def llm_configured():
+    return bool(OPENAI_KEY and len(OPENAI_KEY) > 20)  # Basic validation
+
+async def save_chat_record(chat_message, ai_response):
+    # Save chat history
+    chat_record = {
+        "user_message": chat_message.message,
+        "ai_response": ai_response,
+        "timestamp": datetime.now(),
+        "user_context": chat_message.user_context
+    }
+    await history_writer.put('chat_history', chat_record)
+
 @app.post("/api/chat")
 async def financial_chat(chat_message: ChatMessage):
     try:
-        # Get user context for personalized advice
-        user_context = chat_message.user_context or {}
-        user_age = user_context.get('age', 30)
-        user_income = user_context.get('income', 50000)
-        risk_category = user_context.get('risk_category', 'Moderate Risk')
+        user_age, user_income, risk_category = chat_context(chat_message)
         
         # Normalize the message for pattern matching
         message_lower = chat_message.message.lower()
@@ -411,67 +1187,131 @@ async def financial_chat(chat_message: ChatMessage):
         # Financial Advisory Knowledge Base
         ai_response = generate_financial_advice(message_lower, user_age, user_income, risk_category)
         
+        # Repeat questions from similar profiles reuse an earlier model answer
+        cache_key, cache_message, cache_context = chat_cache_key(chat_message.message, user_age, user_income, risk_category)
+        cached_response = await chat_cache.get(cache_key)
+        
         # Fallback to OpenAI if available (but handle quota exceeded gracefully)
         try:
-            if OPENAI_KEY and len(OPENAI_KEY) > 20:  # Basic validation
-                openai_response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are an AI Financial Advisor specializing in Indian markets. Provide helpful, accurate financial advice. Keep responses concise (2-3 sentences)."},
-                        {"role": "user", "content": f"{chat_message.message}\nUser: {user_age} years old, ₹{user_income} income, {risk_category}"}
-                    ],
-                    max_tokens=150,
-                    temperature=0.7
-                )
-                ai_response = openai_response.choices[0].message.content
+            if cached_response is not None:
+                ai_response = cached_response
+            elif llm_configured():
+                ai_response = await llm_client.complete(chat_llm_messages(chat_message, user_age, user_income, risk_category))
+                # Only model answers are cached; the rule-based ones are cheap and use exact figures
+                await chat_cache.set(cache_key, ai_response, cache_message, cache_context)
+        except (CircuitOpen, LLMBusy):
+            # Upstream is known to be failing, or every slot is taken; answer from the knowledge base
+            pass
         except Exception as openai_error:
             # Continue with fallback response if OpenAI fails
             print(f"OpenAI API unavailable, using fallback: {openai_error}")
         
-        # Save chat history
-        chat_record = {
-            "user_message": chat_message.message,
-            "ai_response": ai_response,
-            "timestamp": datetime.now(),
-            "user_context": chat_message.user_context
-        }
-        await db.chat_history.insert_one(chat_record)
+        await save_chat_record(chat_message, ai_response)
         
         return {"response": ai_response}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.post("/api/chat/stream")
+async def financial_chat_stream(chat_message: ChatMessage):
+    """Server-Sent Events variant of /api/chat.
+
+    Emits ``token`` events ({"text": ...}) as the answer is produced, then one
+    ``done`` event ({"response": ..., "source": "llm" | "cache" | "rules"}) with
+    the final answer. If the model fails part-way, ``done`` carries the
+    rule-based answer and clients should show that instead of the partial text.
+    """
+    user_age, user_income, risk_category = chat_context(chat_message)
+    fallback_response = generate_financial_advice(chat_message.message.lower(), user_age, user_income, risk_category)
+    cache_key, cache_message, cache_context = chat_cache_key(chat_message.message, user_age, user_income, risk_category)
+    cached_response = await chat_cache.get(cache_key)
+    final = {'response': fallback_response}
+
+    async def events():
+        if cached_response is not None:
+            final['response'] = cached_response
+            yield sse_event('token', {'text': cached_response})
+            yield sse_event('done', {'response': cached_response, 'source': 'cache'})
+            return
+        
+        if llm_configured():
+            streamed = []
+            try:
+                async for text in llm_client.stream(chat_llm_messages(chat_message, user_age, user_income, risk_category)):
+                    streamed.append(text)
+                    yield sse_event('token', {'text': text})
+            except (CircuitOpen, LLMBusy):
+                pass
+            except Exception as openai_error:
+                print(f"OpenAI API unavailable, using fallback: {openai_error}")
+            else:
+                final['response'] = ''.join(streamed)
+                await chat_cache.set(cache_key, final['response'], cache_message, cache_context)
+                yield sse_event('done', {'response': final['response'], 'source': 'llm'})
+                return
+            if streamed:
+                yield sse_event('done', {'response': fallback_response, 'source': 'rules'})
+                return
+        
+        # Rule-based answers are ready immediately
+        yield sse_event('token', {'text': fallback_response})
+        yield sse_event('done', {'response': fallback_response, 'source': 'rules'})
+
+    async def save_after_stream():
+        try:
+            await save_chat_record(chat_message, final['response'])
+        except Exception as history_error:
+            print(f"Could not save streamed chat history: {history_error!r}")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(save_after_stream)
+    )
+
+@app.get("/api/llm/status")
+async def get_llm_status():
+    return {**llm_client.stats(), "chat_cache": chat_cache.stats()}
+
 def generate_financial_advice(message_lower, user_age, user_income, risk_category):
     """Generate intelligent financial advice based on user query and profile"""
     
-    # Emergency fund queries (check first to avoid "fund" matching mutual funds)
-    if 'emergency' in message_lower or ('emergency fund' in message_lower):
+    # One pass over the message; intents.json priorities decide overlaps
+    # (e.g. "emergency fund" is emergency_fund, not mutual_funds)
+    intent = intent_matcher.classify(message_lower)
+    
+    # Emergency fund queries
+    if intent == 'emergency_fund':
         emergency_fund = user_income * 6
         return f"Maintain 6-12 months of expenses (approximately ₹{emergency_fund:,.0f}) in liquid funds or high-yield savings accounts. Consider SBI Liquid Fund, HDFC Liquid Fund, or sweep-in FDs. This should be your first priority before any other investment."
     
     # SIP related queries
-    elif any(word in message_lower for word in ['sip', 'systematic', 'monthly']):
+    elif intent == 'sip':
         sip_amount = min(user_income // 10, 10000)
         return f"SIP is excellent for disciplined investing! Start with ₹{sip_amount} monthly across 2-3 diversified equity funds. Consider SBI Bluechip Fund, HDFC Top 100, and Mirae Asset Large Cap Fund. Increase SIP by 10% annually as your income grows."
     
     # Tax saving queries
-    elif any(word in message_lower for word in ['tax', 'save', '80c', 'elss']):
+    elif intent == 'tax_saving':
         return f"For tax saving under Section 80C, ELSS mutual funds are best with 3-year lock-in and market-linked returns. Top ELSS funds: Axis Long Term Equity Fund, Mirae Asset Tax Saver Fund. You can save ₹46,800 tax annually on ₹1.5L investment. Also consider PPF, NSC, and ULIP."
     
     # Retirement planning
-    elif any(word in message_lower for word in ['retirement', 'pension', 'retire']):
+    elif intent == 'retirement':
         if user_age < 35:
             return f"Start early for retirement! Invest ₹{min(user_income//5, 20000)} monthly in equity funds for 25-30 years. Consider NPS for additional tax benefits. With inflation, you'll need ₹5-10 crores for comfortable retirement. Time is your biggest asset!"
         else:
             return f"Retirement planning is crucial at {user_age}. Increase equity allocation to 60-70% if possible. Consider NPS, PPF, and equity mutual funds. Calculate your retirement corpus needs and invest accordingly. Consider consulting a certified financial planner."
     
     # Stock market queries
-    elif any(word in message_lower for word in ['stock', 'share', 'equity', 'nse', 'bse']):
+    elif intent == 'stocks':
         return f"For direct stock investing, start with blue-chip stocks like Reliance, TCS, HDFC Bank, ICICI Bank. Invest only 20-30% of your portfolio in individual stocks. Consider sectors like IT, Banking, and Consumer goods. Always diversify and invest only surplus money."
     
     # Mutual fund queries
-    elif any(word in message_lower for word in ['mutual fund', 'fund', 'mf']):
+    elif intent == 'mutual_funds':
         if risk_category == 'High Risk':
             return "For high-risk tolerance, consider small-cap and mid-cap funds like SBI Small Cap Fund, HDFC Mid-Cap Opportunities Fund. Mix with large-cap funds for stability. Aim for 15-18% long-term returns but expect volatility."
         elif risk_category == 'Low Risk':
@@ -480,11 +1320,11 @@ def generate_financial_advice(message_lower, user_age, user_income, risk_categor
             return "For moderate risk, blend large-cap (50%), mid-cap (30%), and debt funds (20%). Top picks: HDFC Top 100, SBI Magnum Midcap, HDFC Short Term Debt Fund. This gives 12-15% potential returns with manageable risk."
     
     # Risk assessment queries
-    elif any(word in message_lower for word in ['risk', 'safe', 'conservative', 'aggressive']):
+    elif intent == 'risk_profile':
         return f"Your risk profile is {risk_category}. This means you should allocate your portfolio accordingly. Conservative investors: 30% equity, 70% debt. Moderate: 60% equity, 40% debt. Aggressive: 80% equity, 20% debt. Always align investments with your risk tolerance and goals."
     
-    # Investment advice patterns (more general, so put after specific queries)
-    elif any(word in message_lower for word in ['invest', 'investment', 'money', 'portfolio', 'asset']):
+    # Investment advice patterns (lowest priority, so specific queries win)
+    elif intent == 'investment':
         if user_age < 30:
             return f"At {user_age}, you have time on your side! Consider 70-80% equity allocation through SIP in diversified mutual funds like HDFC Top 100 or SBI Bluechip. Start with ₹{min(user_income//10, 10000)} monthly SIP. Focus on large-cap and mid-cap funds for long-term wealth creation."
         elif user_age < 45:
@@ -492,16 +1332,60 @@ def generate_financial_advice(message_lower, user_age, user_income, risk_categor
         else:
             return f"At {user_age}, focus on capital preservation with 50-60% debt and 40-50% equity. Consider balanced hybrid funds, FDs, and PPF. Prioritize liquid funds for emergency corpus and stable income sources."
     
+    # Intents added in intents.json with a response template need no code here
+    elif 'response' in intent_matcher.intents.get(intent, {}):
+        return intent_matcher.intents[intent]['response'].format(
+            user_age=user_age, user_income=user_income, risk_category=risk_category
+        )
+    
     # General advice or unclear queries
     else:
         return f"Based on your profile (₹{user_income:,.0f} income, {user_age} years, {risk_category}), focus on: 1) Build 6-month emergency fund first, 2) Start SIP in diversified equity funds, 3) Consider ELSS for tax saving, 4) Review and rebalance annually. For personalized advice, consult a certified financial planner."
 
+def parse_horizons(horizons):
+    try:
+        horizon_years = [int(years) for years in horizons.split(',') if years.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="horizons must be comma-separated whole years")
+    if not horizon_years or not all(0 < years <= PROJECTION_MAX_YEARS for years in horizon_years):
+        raise HTTPException(status_code=400, detail=f"horizons must be between 1 and {PROJECTION_MAX_YEARS} years")
+    return horizon_years
+
+def dashboard_projections(allocation, monthly_investment):
+    return simulate_projection(allocation, monthly_investment, paths=PROJECTION_PATHS, seed=PROJECTION_SEED)
+
+@app.get("/api/dashboard/{user_id}")
+async def get_dashboard(user_id: str):
+    """Profile, latest risk assessment, latest recommendation and projections in one read"""
+    try:
+        dashboard = await dashboards.get(user_id)
+        if dashboard is None:
+            # Users from before dashboards existed: build theirs once from the source collections
+            profile, recommendation, risk_assessment = await load_portfolio_state(db, user_id)
+            if not profile:
+                raise HTTPException(status_code=404, detail="Profile not found")
+            dashboard = {"profile": profile, "risk_assessment": risk_assessment, "recommendation": recommendation}
+            if recommendation:
+                dashboard["projections"] = await run_in_threadpool(
+                    dashboard_projections,
+                    recommendation['allocation'],
+                    profile['monthly_income'] - profile['monthly_expenses']
+                )
+            await refresh_dashboard(dashboards.replace, user_id, dashboard)
+            dashboard["user_id"] = user_id
+        
+        return dashboard
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/portfolio/{user_id}")
-async def get_portfolio_summary(user_id: str):
+async def get_portfolio_summary(user_id: str, horizons: str = "1,5,10,20", seed: Optional[int] = None):
     try:
-        # Get user profile and recommendations
-        profile = await db.user_profiles.find_one({"user_id": user_id})
-        recommendations = await db.investment_recommendations.find_one({"user_id": user_id})
+        # Profile plus the latest recommendation and risk assessment, in one round-trip
+        profile, recommendations, risk_assessment = await load_portfolio_state(db, user_id)
         
         if not profile or not recommendations:
             raise HTTPException(status_code=404, detail="Portfolio data not found")
@@ -510,41 +1394,446 @@ async def get_portfolio_summary(user_id: str):
         monthly_investment = profile['monthly_income'] - profile['monthly_expenses']
         annual_investment = monthly_investment * 12
         
-        # Projected growth calculations (simplified)
-        growth_rates = {
-            'equity_large_cap': 0.12,  # 12% annual return
-            'equity_mid_cap': 0.15,    # 15% annual return
-            'equity_small_cap': 0.18,  # 18% annual return
-            'mutual_funds_equity': 0.14, # 14% annual return
-            'debt_funds': 0.08,        # 8% annual return
-        }
-        
-        portfolio_value_projections = {}
-        for years in [1, 5, 10, 20]:
-            total_value = 0
-            for rec in recommendations['recommendations']:
-                allocation_percent = rec['allocation_percent'] / 100
-                annual_amount = annual_investment * allocation_percent
-                growth_rate = growth_rates.get(rec['type'].lower().replace(' ', '_'), 0.10)
-                
-                # Simple compound interest calculation
-                future_value = annual_amount * (((1 + growth_rate) ** years - 1) / growth_rate)
-                total_value += future_value
-            
-            portfolio_value_projections[f"{years}_years"] = total_value
+        # Monte Carlo projection over the stored allocation buckets
+        horizon_years = parse_horizons(horizons)
+        projection_bands = await run_in_threadpool(
+            simulate_projection,
+            recommendations['allocation'],
+            monthly_investment,
+            horizons=horizon_years,
+            paths=PROJECTION_PATHS,
+            seed=PROJECTION_SEED if seed is None else seed
+        )
+        portfolio_value_projections = {horizon: bands['median'] for horizon, bands in projection_bands.items()}
         
         portfolio_summary = {
             "user_id": user_id,
             "current_monthly_investment": monthly_investment,
             "annual_investment_capacity": annual_investment,
-            "risk_profile": recommendations.get('risk_category', 'Moderate'),
+            "risk_profile": risk_assessment['risk_category'] if risk_assessment else 'Moderate Risk',
             "asset_allocation": recommendations['allocation'],
             "projected_values": portfolio_value_projections,
+            "projection_bands": projection_bands,
             "recommendations_count": len(recommendations['recommendations'])
         }
         
         return portfolio_summary
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def compute_frontier():
+    """Solve the per-category efficient frontiers, with historical risk where prices have been ingested"""
+    historical_covariance, historical_buckets, window = None, (), None
+    symbols = sorted({symbol for proxies in BUCKET_PROXIES.values() for symbol in proxies})
+    symbols = [symbol for symbol in symbols if price_store.last_date(symbol) is not None]
+    if symbols:
+        start, end = resolve_window(price_store, symbols, lookback_days=RISK_LOOKBACK_DAYS)
+        model = load_return_model(price_store, symbols, start, end)
+        if model is not None:
+            historical_buckets, members, _, _ = bucket_exposures({bucket: 1 for bucket in FRONTIER_BUCKETS}, BUCKET_PROXIES, model.symbols)
+            historical_covariance = members @ model.covariance @ members.T * TRADING_DAYS
+            window = {'start': model.start, 'end': model.end}
+    expected, covariance = bucket_moments(list(FRONTIER_BUCKETS), historical_covariance, historical_buckets)
+    frontiers, allocations = build_frontiers(expected, covariance)
+    return {
+        'computed_at': datetime.utcnow(),
+        'window': window,
+        'historical_buckets': list(historical_buckets),
+        'frontiers': frontiers,
+        'allocations': allocations
+    }
+
+async def load_frontier():
+    global frontier_table
+    stored = await db.efficient_frontiers.find_one({'_id': FRONTIER_ID})
+    if stored is not None:
+        stored.pop('_id')
+        frontier_table = stored
+    return frontier_table
+
+async def refresh_frontier():
+    global frontier_table
+    table = await run_in_threadpool(compute_frontier)
+    await db.efficient_frontiers.replace_one({'_id': FRONTIER_ID}, table, upsert=True)
+    frontier_table = table
+    return table
+
+async def rebuild_frontier_forever():
+    """Recompute the frontier once per refresh interval on the lease holder; other workers pick it up from Mongo"""
+    while True:
+        try:
+            await load_frontier()
+            stale = frontier_table is None or (datetime.utcnow() - frontier_table['computed_at']).total_seconds() >= FRONTIER_REFRESH_INTERVAL
+            # Before any frontier exists, whoever gets here first builds one rather than waiting a day
+            if stale and (snapshot_store.is_leader or frontier_table is None):
+                await refresh_frontier()
+        except Exception as frontier_error:
+            print(f"Efficient frontier refresh failed: {frontier_error!r}")
+        await asyncio.sleep(FRONTIER_POLL_INTERVAL)
+
+def frontier_allocation(risk_score):
+    """Precomputed allocation for a questionnaire score, or None before the frontier job has run"""
+    if frontier_table is None:
+        return None
+    return frontier_table['allocations'].get(str(int(risk_score)))
+
+@app.get("/api/frontier")
+async def get_efficient_frontier():
+    if frontier_table is None:
+        raise HTTPException(status_code=404, detail="Efficient frontier has not been computed yet")
+    return frontier_table
+
+def allocation_risk(allocation, confidence, start, end):
+    symbols = sorted({symbol for bucket, weight in allocation.items() if weight > 0 for symbol in BUCKET_PROXIES.get(bucket, ())} | {NIFTY_SYMBOL})
+    # Only instruments that have been ingested; a bucket with none left is treated as unpriced
+    symbols = [symbol for symbol in symbols if price_store.last_date(symbol) is not None]
+    if NIFTY_SYMBOL not in symbols:
+        return None
+    start, end = resolve_window(price_store, symbols, start, end, RISK_LOOKBACK_DAYS)
+    model = load_return_model(price_store, symbols, start, end)
+    if model is None:
+        return None
+    return portfolio_risk_metrics(model, allocation, BUCKET_PROXIES, NIFTY_SYMBOL, confidence)
+
+@app.get("/api/portfolio/{user_id}/risk")
+async def get_portfolio_risk(user_id: str, confidence: float = 0.95, start: Optional[str] = None, end: Optional[str] = None):
+    """Volatility, VaR/CVaR, beta vs Nifty 50 and bucket correlations for the recommended allocation"""
+    if not 0.5 <= confidence < 1:
+        raise HTTPException(status_code=400, detail="confidence must be in [0.5, 1)")
+    try:
+        recommendations = await db.investment_recommendations.find_one({"user_id": user_id}, sort=[("timestamp", -1)])
+        if not recommendations:
+            raise HTTPException(status_code=404, detail="Portfolio data not found")
+        
+        try:
+            metrics = await run_in_threadpool(allocation_risk, recommendations['allocation'], confidence, start, end)
+        except ValueError as window_error:
+            raise HTTPException(status_code=400, detail=str(window_error))
+        if metrics is None:
+            raise HTTPException(status_code=404, detail="Not enough price history; run /api/prices/ingest first")
+        
+        return {"user_id": user_id, "risk_category": recommendations.get('risk_category'), **metrics}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def backtest_history():
+    """Month labels and monthly bucket returns over all ingested history, or (None, None) without any"""
+    symbols = sorted({symbol for proxies in BUCKET_PROXIES.values() for symbol in proxies})
+    symbols = [symbol for symbol in symbols if price_store.last_date(symbol) is not None]
+    if not symbols:
+        return None, None
+    start, end = resolve_window(price_store, symbols, lookback_days=BACKTEST_LOOKBACK_DAYS)
+    model = load_return_model(price_store, symbols, start, end)
+    if model is None:
+        return None, None
+    return monthly_bucket_returns(model, FRONTIER_BUCKETS, BUCKET_PROXIES)
+
+def run_backtests(allocations, years, monthly_contribution, rebalance_months):
+    """Backtest each allocation from every start month that leaves a full window of history"""
+    labels, monthly_returns = backtest_history()
+    months = years * 12
+    if monthly_returns is None or len(monthly_returns) < months:
+        return None
+    weights = np.array([[allocation.get(bucket, 0) for bucket in FRONTIER_BUCKETS] for allocation in allocations], dtype=np.float64)
+    weights = weights / weights.sum(axis=1, keepdims=True)
+    start_months = np.arange(len(monthly_returns) - months + 1)
+    # One scenario per (allocation, start month), all run together
+    scenario_weights = np.repeat(weights, len(start_months), axis=0)
+    scenario_starts = np.tile(start_months, len(weights))
+    result = backtest(monthly_returns, scenario_weights, scenario_starts, months, monthly_contribution, rebalance_months)
+
+    summaries = []
+    for index, allocation in enumerate(allocations):
+        rows = slice(index * len(start_months), (index + 1) * len(start_months))
+        latest = rows.stop - 1
+        summaries.append({
+            "allocation": allocation,
+            "windows": len(start_months),
+            "cagr": dict(zip(('p5', 'median', 'p95'), np.round(np.percentile(result['cagr'][rows], (5, 50, 95)), 6).tolist())),
+            "sip_irr": dict(zip(('p5', 'median', 'p95'), np.round(np.percentile(result['sip_irr'][rows], (5, 50, 95)), 6).tolist())),
+            "max_drawdown": {"median": round(float(np.median(result['max_drawdown'][rows])), 6), "worst": round(float(result['max_drawdown'][rows].min()), 6)},
+            "latest_window": {
+                "months": labels[start_months[-1]:start_months[-1] + months].astype(str).tolist(),
+                "values": np.round(result['values'][latest], 2).tolist(),
+                "returns": np.round(result['returns'][latest], 6).tolist(),
+                "cagr": round(float(result['cagr'][latest]), 6),
+                "sip_irr": round(float(result['sip_irr'][latest]), 6),
+                "max_drawdown": round(float(result['max_drawdown'][latest]), 6)
+            }
+        })
+    return {
+        "years": years,
+        "monthly_contribution": monthly_contribution,
+        "contributed": result['contributed'],
+        "rebalance_months": rebalance_months,
+        "history": {"start": str(labels[0]), "end": str(labels[-1])},
+        "results": summaries
+    }
+
+def validate_backtest(allocations, years, rebalance_months):
+    if not allocations or len(allocations) > BACKTEST_MAX_ALLOCATIONS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {BACKTEST_MAX_ALLOCATIONS} allocations per backtest")
+    if any(not allocation or min(allocation.values()) < 0 or sum(allocation.values()) <= 0 for allocation in allocations):
+        raise HTTPException(status_code=400, detail="Allocations need non-negative weights with a positive total")
+    unknown = sorted({bucket for allocation in allocations for bucket in allocation} - set(FRONTIER_BUCKETS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown allocation buckets: {', '.join(unknown)}")
+    if not 1 <= years <= PROJECTION_MAX_YEARS or rebalance_months < 0:
+        raise HTTPException(status_code=400, detail=f"years must be between 1 and {PROJECTION_MAX_YEARS}, rebalance_months >= 0")
+
+@app.post("/api/backtest")
+async def backtest_allocations(request: BacktestRequest):
+    """Historical monthly-SIP backtest of up to BACKTEST_MAX_ALLOCATIONS allocations over every start month"""
+    validate_backtest(request.allocations, request.years, request.rebalance_months)
+    try:
+        result = await run_in_threadpool(run_backtests, request.allocations, request.years, request.monthly_contribution, request.rebalance_months)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Not enough price history for this backtest window; run /api/prices/ingest first")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/portfolio/{user_id}/backtest")
+async def backtest_portfolio(user_id: str, years: int = 5, rebalance_months: int = 12):
+    try:
+        profile, recommendations, _ = await load_portfolio_state(db, user_id)
+        
+        if not profile or not recommendations:
+            raise HTTPException(status_code=404, detail="Portfolio data not found")
+        
+        allocation = recommendations['allocation']
+        validate_backtest([allocation], years, rebalance_months)
+        monthly_investment = max(profile['monthly_income'] - profile['monthly_expenses'], 0)
+        result = await run_in_threadpool(run_backtests, [allocation], years, monthly_investment or 1, rebalance_months)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Not enough price history for this backtest window; run /api/prices/ingest first")
+        
+        return {"user_id": user_id, **result}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def evaluate_scenarios(current_allocation, current_contribution, variants, portfolio_value, horizons, seed):
+    """Projections and rebalancing trades for every variant against the current allocation, in one pass"""
+    buckets = list(FRONTIER_BUCKETS)
+    current = np.array([current_allocation.get(bucket, 0) for bucket in buckets], dtype=np.float64)
+    current = current / current.sum()
+    targets = np.array([
+        [(variant.allocation or current_allocation).get(bucket, 0) for bucket in buckets] for variant in variants
+    ], dtype=np.float64)
+    targets = targets / targets.sum(axis=1, keepdims=True)
+    contributions = np.array([
+        current_contribution if variant.monthly_contribution is None else variant.monthly_contribution for variant in variants
+    ], dtype=np.float64)
+
+    # Current portfolio first, so every variant is compared on the same simulated paths
+    projections = simulate_variants(
+        buckets,
+        np.vstack([current, targets]),
+        np.r_[current_contribution, contributions],
+        initial_values=np.full(len(variants) + 1, portfolio_value),
+        horizons=horizons,
+        paths=PROJECTION_PATHS,
+        seed=seed
+    )
+    weight_changes = targets - current
+    trades = np.round(weight_changes * portfolio_value, 2)
+    sip_changes = np.round(contributions[:, None] * targets - current_contribution * current, 2)
+    turnover = np.abs(weight_changes).sum(axis=1) / 2
+
+    def percent(weights):
+        return {bucket: round(float(weight) * 100, 2) for bucket, weight in zip(buckets, weights) if weight > 0}
+
+    results = [{
+        "name": "current",
+        "allocation": percent(current),
+        "monthly_contribution": current_contribution,
+        "projection": projections[0]
+    }]
+    for row, variant in enumerate(variants):
+        results.append({
+            "name": variant.name or f"variant_{row + 1}",
+            "allocation": percent(targets[row]),
+            "monthly_contribution": float(contributions[row]),
+            "projection": projections[row + 1],
+            "rebalancing": {
+                "turnover_percent": round(float(turnover[row]) * 100, 2),
+                # Positive buys, negative sells, in rupees of the current portfolio value
+                "trades": {bucket: float(trades[row, column]) for column, bucket in enumerate(buckets) if trades[row, column]},
+                "monthly_sip_change": {bucket: float(sip_changes[row, column]) for column, bucket in enumerate(buckets) if sip_changes[row, column]}
+            }
+        })
+    return results
+
+@app.post("/api/portfolio/{user_id}/scenarios")
+async def compare_portfolio_scenarios(user_id: str, request: ScenarioRequest):
+    """Compare what-if allocation/contribution variants against the user's current plan; read-only, no LLM"""
+    if not 1 <= len(request.variants) <= SCENARIO_MAX_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {SCENARIO_MAX_VARIANTS} variants per request")
+    if not request.horizons or not all(0 < years <= PROJECTION_MAX_YEARS for years in request.horizons):
+        raise HTTPException(status_code=400, detail=f"horizons must be between 1 and {PROJECTION_MAX_YEARS} years")
+    if request.portfolio_value < 0:
+        raise HTTPException(status_code=400, detail="portfolio_value must not be negative")
+    for variant in request.variants:
+        allocation = variant.allocation
+        if allocation is not None:
+            unknown = sorted(set(allocation) - set(FRONTIER_BUCKETS))
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown allocation buckets: {', '.join(unknown)}")
+            if min(allocation.values(), default=0) < 0 or sum(allocation.values()) <= 0:
+                raise HTTPException(status_code=400, detail="Allocations need non-negative weights with a positive total")
+        if variant.monthly_contribution is not None and variant.monthly_contribution < 0:
+            raise HTTPException(status_code=400, detail="monthly_contribution must not be negative")
+    try:
+        profile, recommendations, _ = await load_portfolio_state(db, user_id)
+        
+        if not profile or not recommendations:
+            raise HTTPException(status_code=404, detail="Portfolio data not found")
+        
+        monthly_investment = max(profile['monthly_income'] - profile['monthly_expenses'], 0)
+        scenarios = await run_in_threadpool(
+            evaluate_scenarios,
+            recommendations['allocation'],
+            monthly_investment,
+            request.variants,
+            request.portfolio_value,
+            tuple(request.horizons),
+            PROJECTION_SEED if request.seed is None else request.seed
+        )
+        
+        return {"user_id": user_id, "portfolio_value": request.portfolio_value, "scenarios": scenarios}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def latest_allocations_cursor():
+    """Each user's most recent allocation, streamed in STRESS_CHUNK_SIZE batches"""
+    return db.investment_recommendations.aggregate(
+        [
+            {"$sort": {"user_id": 1, "timestamp": -1}},
+            {"$group": {"_id": "$user_id", "allocation": {"$first": "$allocation"}}}
+        ],
+        allowDiskUse=True,
+        batchSize=STRESS_CHUNK_SIZE
+    )
+
+async def execute_stress_test(run_id, scenarios):
+    executor = None
+    try:
+        if STRESS_PROCESS_WORKERS > 1 and await db.investment_recommendations.estimated_document_count() >= STRESS_PROCESS_THRESHOLD:
+            executor = ProcessPoolExecutor(max_workers=STRESS_PROCESS_WORKERS)
+        result = await run_stress_test(
+            latest_allocations_cursor(),
+            scenarios,
+            chunk_size=STRESS_CHUNK_SIZE,
+            executor=executor,
+            max_pending=2 * (STRESS_PROCESS_WORKERS if executor else 1)
+        )
+        update = {"status": "done", **result}
+    except Exception as stress_error:
+        update = {"status": "failed", "error": f"{type(stress_error).__name__}: {stress_error}"}
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    update["finished_at"] = datetime.utcnow()
+    await db.stress_test_runs.update_one({"_id": run_id}, {"$set": update})
+
+@app.post("/api/stress-test")
+async def start_stress_test(request: StressTestRequest):
+    """Apply shock scenarios to every user's latest allocation; poll GET /api/stress-test/{run_id} for the result"""
+    unknown_presets = sorted(set(request.presets) - set(PRESET_SCENARIOS))
+    if unknown_presets:
+        raise HTTPException(status_code=400, detail=f"Unknown presets: {', '.join(unknown_presets)}")
+    scenarios = {name: PRESET_SCENARIOS[name] for name in request.presets}
+    scenarios.update({name: scenario.dict() for name, scenario in request.scenarios.items()})
+    if not scenarios:
+        scenarios = dict(PRESET_SCENARIOS)
+    for name, scenario in scenarios.items():
+        unknown = sorted(set(scenario['shocks']) - set(STRESS_BUCKETS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Scenario {name}: unknown buckets {', '.join(unknown)}")
+        if any(shock < -1 for shock in scenario['shocks'].values()):
+            raise HTTPException(status_code=400, detail=f"Scenario {name}: a bucket cannot lose more than 100%")
+    try:
+        run_id = str(uuid.uuid4())
+        await db.stress_test_runs.insert_one({"_id": run_id, "status": "running", "scenarios": scenarios, "started_at": datetime.utcnow()})
+        task = asyncio.create_task(execute_stress_test(run_id, scenarios))
+        stress_tasks.add(task)
+        task.add_done_callback(stress_tasks.discard)
+        return {"run_id": run_id, "status": "running"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/stress-test/{run_id}")
+async def get_stress_test(run_id: str):
+    run = await db.stress_test_runs.find_one({"_id": run_id})
+    if run is None:
+        raise HTTPException(status_code=404, detail="Stress test run not found")
+    run["run_id"] = run.pop("_id")
+    return run
+
+def months_until(target_date, today=None):
+    """Whole calendar months from this month to the target's; zero or negative for this month or earlier"""
+    today = today or date.today()
+    return (target_date.year - today.year) * 12 + target_date.month - today.month
+
+@app.post("/api/goals/plan")
+async def plan_financial_goals(request: GoalPlanRequest):
+    """Required monthly SIP per goal and in total, under the return bands of the user's risk category"""
+    if not request.goals:
+        raise HTTPException(status_code=400, detail="At least one goal is required")
+    if any(goal.target_amount <= 0 or goal.current_savings < 0 for goal in request.goals):
+        raise HTTPException(status_code=400, detail="Goals need a positive target_amount and non-negative current_savings")
+    months = [months_until(goal.target_date) for goal in request.goals]
+    if any(month < 1 for month in months):
+        raise HTTPException(status_code=400, detail="Goals need a target_date in a future month")
+    if request.risk_category is not None and request.risk_category not in RETURN_BANDS:
+        raise HTTPException(status_code=400, detail=f"risk_category must be one of {', '.join(RETURN_BANDS)}")
+    try:
+        risk_category, monthly_budget = request.risk_category, request.monthly_budget
+        if request.user_id and (risk_category is None or monthly_budget is None):
+            profile = await db.user_profiles.find_one({"user_id": request.user_id})
+            if not profile:
+                raise HTTPException(status_code=404, detail="User profile not found")
+            if monthly_budget is None:
+                monthly_budget = max(profile['monthly_income'] - profile['monthly_expenses'], 0)
+            if risk_category is None:
+                risk_assessment = await db.risk_assessments.find_one({"user_id": request.user_id}, sort=[("timestamp", -1)])
+                risk_category = risk_assessment['risk_category'] if risk_assessment else None
+        risk_category = risk_category or 'Moderate Risk'
+        
+        goals = [goal.dict() for goal in request.goals]
+        plan, summary = plan_goals(
+            goals,
+            months,
+            risk_category,
+            monthly_budget=monthly_budget,
+            inflation=request.inflation
+        )
+        
+        return {
+            "user_id": request.user_id,
+            "risk_category": risk_category,
+            "monthly_budget": monthly_budget,
+            "inflation": request.inflation,
+            "goals": plan,
+            "summary": summary
+        }
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,146 @@
+import asyncio
+
+import numpy as np
+
+from projections import ASSET_CLASS_ASSUMPTIONS
+
+STRESS_BUCKETS = tuple(ASSET_CLASS_ASSUMPTIONS)
+
+# Modified duration (years) of the rate-sensitive buckets: a +100bp move costs
+# roughly duration percent. Short-term debt funds sit around three years.
+RATE_DURATIONS = {'debt_funds': 3.0, 'emergency_buffer': 0.25}
+
+PRESET_SCENARIOS = {
+    'midcap_crash_rate_hike': {
+        'shocks': {'equity_large_cap': -0.15, 'equity_mid_cap': -0.30, 'equity_small_cap': -0.35, 'mutual_funds_equity': -0.15},
+        'rate_change_bps': 200
+    },
+    'broad_equity_crash': {
+        'shocks': {'equity_large_cap': -0.35, 'equity_mid_cap': -0.45, 'equity_small_cap': -0.55, 'mutual_funds_equity': -0.35},
+        'rate_change_bps': -100
+    },
+    'rate_shock': {'shocks': {}, 'rate_change_bps': 300},
+}
+
+# Portfolio returns are histogrammed at 0.1% resolution, so chunk results merge
+# exactly and percentiles never need every user's loss in memory at once
+HISTOGRAM_EDGES = np.linspace(-1.0, 1.0, 2001)
+LOSS_THRESHOLDS = (0.10, 0.20, 0.30)
+LOSS_PERCENTILES = (50, 90, 95, 99)
+
+
+def shock_vector(scenario, buckets=STRESS_BUCKETS):
+    """Instantaneous return of each bucket under a scenario's price shocks and rate move"""
+    shocks = scenario.get('shocks', {})
+    rate_change = scenario.get('rate_change_bps', 0) / 10000
+    return np.array([shocks.get(bucket, 0.0) - RATE_DURATIONS.get(bucket, 0.0) * rate_change for bucket in buckets])
+
+
+def allocation_matrix(allocations, buckets=STRESS_BUCKETS):
+    """Normalized (users x buckets) weights; allocations with no positive weight are dropped"""
+    column = {bucket: index for index, bucket in enumerate(buckets)}
+    weights = np.zeros((len(allocations), len(buckets)))
+    for row, allocation in enumerate(allocations):
+        for bucket, weight in (allocation or {}).items():
+            if bucket in column and weight > 0:
+                weights[row, column[bucket]] = weight
+    totals = weights.sum(axis=1)
+    return weights[totals > 0] / totals[totals > 0, None]
+
+
+def evaluate_chunk(allocations, shocks):
+    """Mergeable loss statistics for one chunk of allocations under every scenario (rows of ``shocks``).
+
+    Plain module-level function on picklable inputs, so it can run in a process pool.
+    """
+    weights = allocation_matrix(allocations)
+    returns = weights @ shocks.T  # users x scenarios
+    scenarios = shocks.shape[0]
+    bins = len(HISTOGRAM_EDGES) - 1
+    index = np.clip(np.searchsorted(HISTOGRAM_EDGES, returns, side='right') - 1, 0, bins - 1)
+    histogram = np.bincount((index + np.arange(scenarios) * bins).ravel(), minlength=scenarios * bins).reshape(scenarios, bins)
+    return {
+        'users': len(weights),
+        'histogram': histogram,
+        'loss_sum': -returns.sum(axis=0),
+        'worst_loss': -returns.min(axis=0) if len(weights) else np.full(scenarios, -np.inf),
+        'over_threshold': np.array([(returns <= -threshold).sum(axis=0) for threshold in LOSS_THRESHOLDS]),
+    }
+
+
+class StressAccumulator:
+    """Running totals of chunk results"""
+
+    def __init__(self, scenarios):
+        self.users = 0
+        self.histogram = np.zeros((scenarios, len(HISTOGRAM_EDGES) - 1), dtype=np.int64)
+        self.loss_sum = np.zeros(scenarios)
+        self.worst_loss = np.full(scenarios, -np.inf)
+        self.over_threshold = np.zeros((len(LOSS_THRESHOLDS), scenarios), dtype=np.int64)
+
+    def add(self, chunk):
+        self.users += chunk['users']
+        self.histogram += chunk['histogram']
+        self.loss_sum += chunk['loss_sum']
+        self.worst_loss = np.maximum(self.worst_loss, chunk['worst_loss'])
+        self.over_threshold += chunk['over_threshold']
+
+    def loss_percentile(self, scenario, percentile):
+        # The p-th percentile loss is minus the (100 - p)-th percentile return,
+        # reported at the lower edge of its histogram bin (the conservative side)
+        cumulative = np.cumsum(self.histogram[scenario])
+        rank = np.searchsorted(cumulative, (100 - percentile) / 100 * self.users, side='left')
+        return -float(HISTOGRAM_EDGES[min(rank, len(HISTOGRAM_EDGES) - 2)])
+
+    def summary(self, names):
+        if not self.users:
+            return {name: {'users': 0} for name in names}
+        return {
+            name: {
+                'users': self.users,
+                'mean_loss': round(float(self.loss_sum[row]) / self.users, 6),
+                'worst_loss': round(float(self.worst_loss[row]), 6),
+                **{f'p{percentile}_loss': round(self.loss_percentile(row, percentile), 6) for percentile in LOSS_PERCENTILES},
+                'users_losing_over': {
+                    f'{int(threshold * 100)}%': int(self.over_threshold[index, row]) for index, threshold in enumerate(LOSS_THRESHOLDS)
+                },
+            }
+            for row, name in enumerate(names)
+        }
+
+
+async def run_stress_test(cursor, scenarios, chunk_size=50000, executor=None, max_pending=4):
+    """Stream allocations from an async cursor in chunks and evaluate every scenario on each.
+
+    Chunks go to ``executor`` (a process pool for big runs; the default thread
+    pool otherwise). At most ``max_pending`` chunks are in flight, so memory
+    stays bounded by chunk size however large the collection is.
+    """
+    names = list(scenarios)
+    shocks = np.array([shock_vector(scenarios[name]) for name in names])
+    totals = StressAccumulator(len(names))
+    loop = asyncio.get_running_loop()
+    pending = set()
+
+    async def drain(limit):
+        nonlocal pending
+        while len(pending) > limit:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                totals.add(future.result())
+
+    chunk = []
+    async for document in cursor:
+        chunk.append(document.get('allocation'))
+        if len(chunk) >= chunk_size:
+            pending.add(loop.run_in_executor(executor, evaluate_chunk, chunk, shocks))
+            chunk = []
+            await drain(max_pending - 1)
+    if chunk:
+        pending.add(loop.run_in_executor(executor, evaluate_chunk, chunk, shocks))
+    await drain(0)
+    return {
+        'users': totals.users,
+        'shocks': {name: dict(zip(STRESS_BUCKETS, np.round(shocks[row], 6).tolist())) for row, name in enumerate(names)},
+        'results': totals.summary(names),
+    }
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Buffer history/audit inserts and write them with insert_many in the background.
+
+    ``put`` returns as soon as the document is queued; a flusher task writes a
+    batch once ``max_batch`` documents are waiting or ``flush_interval``
+    seconds after the first one arrived, one unordered insert_many per
+    collection. The queue holds at most ``max_pending`` documents: when it is
+    full, ``put`` waits for the flusher (backpressure) rather than growing.
+    """
+
+    def __init__(self, db, max_batch=500, flush_interval=0.2, max_pending=10000):
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._batch_full = asyncio.Event()
+        self._flusher = None
+        self._closed = False
+        self._putting = 0  # puts waiting for room in the queue
+        self._puts_settled = asyncio.Event()
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = None
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def put(self, collection, document):
+        if self._closed or self._flusher is None:
+            # Not running (or shutting down): write through rather than lose the record
+            await self.db[collection].insert_one(document)
+            return
+        if self._queue.full():
+            self.backpressure_waits += 1
+        self._putting += 1
+        try:
+            await self._queue.put((collection, document))
+        finally:
+            self._putting -= 1
+            if not self._putting:
+                self._puts_settled.set()
+        if self._queue.qsize() >= self.max_batch:
+            self._batch_full.set()
+
+    async def _write(self, batch):
+        by_collection = {}
+        for collection, document in batch:
+            by_collection.setdefault(collection, []).append(document)
+        started = time.perf_counter()
+        for collection, documents in by_collection.items():
+            try:
+                await self.db[collection].insert_many(documents, ordered=False)
+                self.written += len(documents)
+            except Exception as write_error:
+                # History is best-effort: log and drop rather than block the queue
+                self.failed += len(documents)
+                print(f"Write-behind insert into {collection} failed for {len(documents)} documents: {write_error!r}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    async def _flush_forever(self):
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            # Give the batch until the interval is up to fill, unless it fills first
+            # or we're shutting down (then everything up to the stop marker is queued)
+            if not self._closed and self._queue.qsize() < self.max_batch - 1:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_full.clear()
+            batch = [first]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def close(self):
+        """Flush everything queued so far and stop; later puts write through"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None:
+            # Puts already waiting for room go in first (later ones write through),
+            # so the stop marker queues behind every pending document
+            while self._putting:
+                self._puts_settled.clear()
+                await self._puts_settled.wait()
+            await self._queue.put(_STOP)
+            self._batch_full.set()
+            await self._flusher
+            self._flusher = None
+
+    def stats(self):
+        return {
+            'depth': self._queue.qsize(),
+            'max_pending': self.max_pending,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+            'backpressure_waits': self.backpressure_waits,
+            'last_flush_ms': None if self.last_flush_ms is None else round(self.last_flush_ms, 3),
+            'avg_flush_ms': round(self._total_flush_ms / self.batches, 3) if self.batches else None,
+            'max_flush_ms': round(self.max_flush_ms, 3),
+        }
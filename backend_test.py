@@ -54,7 +54,10 @@ class FinancialAdvisorAPITester:
                 'response': response_data if response_data else response.text[:500]
             }
 
-            return success, response_data if success and check_json else None
+            if not success:
+                return False, None
+            # Non-JSON bodies come back whole; only the stored summary is truncated
+            return True, response_data if check_json else response.text
 
         except Exception as e:
             print(f"❌ Failed - Error: {str(e)}")
@@ -82,6 +85,24 @@ class FinancialAdvisorAPITester:
             200
         )
 
+    def test_bulk_quotes(self):
+        """Test the bulk quote endpoint with a mix of valid and invalid symbols"""
+        success, response = self.run_test(
+            "Bulk Quotes",
+            "GET",
+            "/api/quotes?symbols=RELIANCE.BSE,TCS.BSE,NSEI,not%20a%20symbol",
+            200
+        )
+        
+        if success and response:
+            statuses = {quote['symbol']: quote['status'] for quote in response['quotes']}
+            print(f"Quote statuses: {statuses}")
+            if statuses.get('NOT A SYMBOL') != 'error':
+                print("❌ Invalid symbol should be reported as a per-symbol error")
+                return False, response
+        
+        return success, response
+
     def test_create_profile(self):
         """Test creating a user profile"""
         test_profile = {
@@ -222,6 +243,35 @@ class FinancialAdvisorAPITester:
         # Return overall success
         return all(result["success"] for result in results), results
 
+    def test_chat_stream(self):
+        """Test the streaming chat endpoint returns Server-Sent Events ending in a done event"""
+        chat_data = {
+            "message": "Should I start SIP?",
+            "user_context": {
+                "risk_category": "Moderate Risk",
+                "age": 30,
+                "income": 75000
+            }
+        }
+        
+        success, body = self.run_test(
+            "AI Chat Stream",
+            "POST",
+            "/api/chat/stream",
+            200,
+            data=chat_data,
+            check_json=False
+        )
+        
+        # The done event follows every token, so check the whole stream rather than the stored excerpt
+        events = [line[len('event: '):] for line in (body or '').splitlines() if line.startswith('event: ')]
+        if success and (not events or events[-1] != 'done'):
+            print("❌ Stream did not finish with a done event")
+            self.test_results["AI Chat Stream"]['success'] = False
+            return False, body
+        
+        return success, body
+
     def test_portfolio(self):
         """Test the portfolio endpoint"""
         if not self.user_id:
@@ -235,6 +285,28 @@ class FinancialAdvisorAPITester:
             200
         )
 
+    def test_dashboard(self):
+        """Test the dashboard holds the profile, risk assessment, recommendation and projections"""
+        if not self.user_id:
+            print("❌ Cannot test dashboard without a user ID")
+            return False, None
+        
+        success, response = self.run_test(
+            "User Dashboard",
+            "GET",
+            f"/api/dashboard/{self.user_id}",
+            200
+        )
+        
+        if success and response:
+            missing = [section for section in ('profile', 'risk_assessment', 'recommendation', 'projections') if not response.get(section)]
+            if missing:
+                print(f"❌ Dashboard is missing sections: {missing}")
+                self.test_results["User Dashboard"]['success'] = False
+                return False, response
+        
+        return success, response
+
     def run_all_tests(self):
         """Run all API tests in sequence"""
         print("🚀 Starting API Tests for AI Financial Advisor")
@@ -247,6 +319,9 @@ class FinancialAdvisorAPITester:
         # Test market data
         self.test_market_data()
         
+        # Test bulk quotes
+        self.test_bulk_quotes()
+        
         # Test user profile creation
         self.test_create_profile()
         
@@ -262,9 +337,15 @@ class FinancialAdvisorAPITester:
         # Test multiple chat scenarios
         self.test_chat_scenarios()
         
+        # Test streaming chat
+        self.test_chat_stream()
+        
         # Test portfolio
         self.test_portfolio()
         
+        # Test dashboard
+        self.test_dashboard()
+        
         # Print summary
         print("\n" + "=" * 80)
         print(f"📊 Tests passed: {self.tests_passed}/{self.tests_run}")
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from backtest import backtest, sip_irr
+
+
+def loop_backtest(monthly_returns, allocation, start, months, contribution, rebalance_every):
+    holdings = [0.0] * len(allocation)
+    values = []
+    for month in range(months):
+        returns = monthly_returns[start + month]
+        holdings = [(held + contribution * weight) * (1 + ret) for held, weight, ret in zip(holdings, allocation, returns)]
+        values.append(sum(holdings))
+        if rebalance_every and (month + 1) % rebalance_every == 0:
+            holdings = [values[-1] * weight for weight in allocation]
+    return values
+
+
+@pytest.mark.parametrize('rebalance_every', [0, 1, 12])
+def test_matches_a_plain_month_by_month_loop(rebalance_every):
+    rng = np.random.default_rng(5)
+    monthly_returns = rng.normal(0.008, 0.05, size=(120, 4))
+    allocations = rng.dirichlet(np.ones(4), size=6)
+    starts = rng.integers(0, 60, size=6)
+    result = backtest(monthly_returns, allocations, starts, 60, contribution=10000, rebalance_every=rebalance_every)
+    for row in range(6):
+        expected = loop_backtest(monthly_returns, allocations[row], starts[row], 60, 10000, rebalance_every)
+        assert result['values'][row] == pytest.approx(expected, rel=1e-12)
+    assert result['contributed'] == 600000
+
+
+def test_constant_returns_give_that_cagr_and_irr_and_no_drawdown():
+    monthly = (1 + 0.12) ** (1 / 12) - 1
+    result = backtest(np.full((36, 2), monthly), [[0.5, 0.5]], [0], 36)
+    assert result['cagr'][0] == pytest.approx(0.12)
+    assert result['sip_irr'][0] == pytest.approx(0.12)
+    assert result['max_drawdown'][0] == pytest.approx(0.0)
+
+
+def test_drawdown_is_measured_on_time_weighted_growth():
+    monthly_returns = np.array([[0.1], [-0.5], [0.2]])
+    result = backtest(monthly_returns, [[1.0]], [0], 3)
+    assert result['max_drawdown'][0] == pytest.approx(-0.5)
+
+
+def test_sip_irr_of_just_the_contributions_is_zero():
+    assert sip_irr(np.array([12.0]), 1.0, 12)[0] == pytest.approx(0.0, abs=1e-12)
+
+
+def test_window_past_history_is_rejected():
+    with pytest.raises(ValueError):
+        backtest(np.zeros((24, 1)), [[1.0]], [13], 12)
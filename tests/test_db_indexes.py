@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from db_indexes import INDEXES, IndexCreationError, ensure_indexes
+
+
+class IndexedCollection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+
+    async def create_indexes(self, models):
+        if self.fail:
+            raise OperationFailure("E11000 duplicate key error", code=11000)
+        self.created.extend(model.document['name'] for model in models)
+
+
+class Database(dict):
+    def __missing__(self, name):
+        self[name] = IndexedCollection()
+        return self[name]
+
+
+def test_one_failing_collection_does_not_block_the_others():
+    db = Database(user_profiles=IndexedCollection(fail=True))
+    with pytest.raises(IndexCreationError) as raised:
+        asyncio.run(ensure_indexes(db, 90))
+    assert list(raised.value.failures) == ['user_profiles']
+    assert 'user_profiles' in str(raised.value)
+    for collection in ('risk_assessments', 'investment_recommendations'):
+        assert db[collection].created == [model.document['name'] for model in INDEXES[collection]]
+    assert db['chat_history'].created == ['timestamp_ttl']
+
+
+def test_every_failure_is_reported_together():
+    db = Database(user_profiles=IndexedCollection(fail=True), risk_assessments=IndexedCollection(fail=True))
+    with pytest.raises(IndexCreationError) as raised:
+        asyncio.run(ensure_indexes(db, 90))
+    assert sorted(raised.value.failures) == ['risk_assessments', 'user_profiles']
+
+
+class PartlyFailingCollection(IndexedCollection):
+    async def create_indexes(self, models):
+        if any(model.document.get('unique') for model in models):
+            raise OperationFailure("E11000 duplicate key error", code=11000)
+        await super().create_indexes(models)
+
+
+def test_a_refused_unique_index_still_leaves_the_collections_other_indexes():
+    db = Database(investment_recommendations=PartlyFailingCollection())
+    with pytest.raises(IndexCreationError) as raised:
+        asyncio.run(ensure_indexes(db, 90))
+    assert db['investment_recommendations'].created == ['user_id_timestamp']
+    # Points at the migration instead of touching any documents itself
+    assert 'migrate_recommendations.py --apply' in str(raised.value)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from goals import SCENARIOS, plan_goals, required_sip
+
+
+def simulated_value(sip, corpus, months, annual_return):
+    """Month-by-month value with the SIP invested at the start of each month"""
+    rate = (1 + annual_return) ** (1 / 12) - 1
+    value = corpus
+    for _ in range(months):
+        value = (value + sip) * (1 + rate)
+    return value
+
+
+@pytest.mark.parametrize('annual_return', [0.06, 0.1, 0.16])
+def test_required_sip_reaches_the_target_exactly(annual_return):
+    targets, corpus, months = [1_000_000, 5_000_000, 250_000], [0, 200_000, 10_000], [12, 120, 37]
+    sip = required_sip(targets, corpus, months, [annual_return])[0]
+    for column in range(3):
+        assert simulated_value(sip[column], corpus[column], months[column], annual_return) == pytest.approx(targets[column], rel=1e-9)
+
+
+def test_required_sip_at_a_zero_return_is_a_straight_division():
+    assert required_sip([120_000], [0], [12], [0.0])[0, 0] == pytest.approx(10_000)
+
+
+def test_no_sip_needed_once_savings_outgrow_the_target():
+    assert required_sip([100_000], [90_000], [24], [0.1])[0, 0] == 0
+
+
+def test_targets_are_inflated_to_the_goal_date():
+    plan, _ = plan_goals([{'name': 'car', 'target_amount': 100_000}], [24], 'Low Risk', inflation=0.06)
+    assert plan[0]['target_at_goal_date'] == pytest.approx(100_000 * 1.06 ** 2, abs=0.01)
+
+
+def goal(name, target, priority):
+    return {'name': name, 'target_amount': target, 'priority': priority}
+
+
+def test_budget_funds_greedily_in_priority_then_date_order():
+    goals = [goal('trip', 100_000, 3), goal('house', 5_000_000, 1), goal('car', 1_000_000, 2), goal('laptop', 150_000, 2)]
+    months = [12, 60, 24, 6]
+    unlimited, _ = plan_goals(goals, months, 'Moderate Risk')
+    sip = {item['name']: item['monthly_sip']['expected'] for item in unlimited}
+    # Enough for everything except the house, which comes first
+    budget = sip['car'] + sip['laptop'] + sip['trip'] + 1
+    assert sip['house'] > budget
+
+    plan, summary = plan_goals(goals, months, 'Moderate Risk', monthly_budget=budget)
+    funded = {item['name']: item['funded']['expected'] for item in plan}
+    assert funded == {'house': False, 'car': True, 'laptop': True, 'trip': True}
+    assert summary['expected']['shortfall'] == pytest.approx(sum(sip.values()) - budget, abs=0.05)
+
+
+def test_when_goals_compete_the_higher_priority_and_earlier_one_wins():
+    goals = [goal('later', 600_000, 1), goal('sooner', 600_000, 1), goal('minor', 600_000, 2)]
+    months = [36, 24, 12]
+    unlimited, _ = plan_goals(goals, months, 'Low Risk')
+    sip = {item['name']: item['monthly_sip'] for item in unlimited}
+    # Room for the sooner goal only, in every scenario
+    budget = max(sip['sooner'].values()) + 1
+    assert all(budget < sip['sooner'][scenario] + sip['later'][scenario] for scenario in SCENARIOS)
+    assert all(budget < sip['sooner'][scenario] + sip['minor'][scenario] for scenario in SCENARIOS)
+
+    plan, _ = plan_goals(goals, months, 'Low Risk', monthly_budget=budget)
+    funded = {item['name']: item['funded'] for item in plan}
+    assert all(funded['sooner'].values())
+    assert not any(funded['later'].values())
+    assert not any(funded['minor'].values())
+
+
+def test_without_a_budget_everything_is_funded_and_there_is_no_shortfall():
+    plan, summary = plan_goals([goal('house', 5_000_000, 1)], [60], 'High Risk')
+    assert all(plan[0]['funded'].values())
+    assert all(summary[scenario]['shortfall'] is None for scenario in SCENARIOS)
+    assert np.diff([plan[0]['monthly_sip'][scenario] for scenario in SCENARIOS]).max() < 0
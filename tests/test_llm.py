@@ -0,0 +1,225 @@
+import asyncio
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+import llm
+from llm import CircuitBreaker, CircuitOpen, LLMBusy, LLMClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    # Only llm's view of the clock: the event loop needs the real time.monotonic
+    monkeypatch.setattr(llm, 'time', SimpleNamespace(monotonic=fake))
+    return fake
+
+
+def test_breaker_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure(TimeoutError())
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+    breaker.record_failure(TimeoutError("deadline"))
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.status()['last_error'] == "TimeoutError: deadline"
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure(TimeoutError())
+    breaker.record_success()
+    breaker.record_failure(TimeoutError())
+    assert breaker.state == 'closed'
+
+
+def test_half_open_allows_exactly_one_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(TimeoutError())
+    clock.now += 59
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+
+def test_half_open_trial_success_closes_and_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure(TimeoutError(), trip=True)
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure(TimeoutError())
+    assert breaker.state == 'open'
+
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow() and breaker.allow()
+
+
+def test_cancelled_trial_frees_the_half_open_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(TimeoutError())
+    clock.now += 60
+    assert breaker.allow()
+    breaker.cancel_trial()
+    assert breaker.allow()
+
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def test_client_returns_completion_and_records_success(clock, monkeypatch):
+    async def acreate(**kwargs):
+        return completion("Start a SIP")
+
+    monkeypatch.setattr(openai.ChatCompletion, 'acreate', acreate)
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = LLMClient('gpt-3.5-turbo', timeout=1, max_concurrency=2, breaker=breaker)
+    assert asyncio.run(client.complete([{'role': 'user', 'content': 'hi'}])) == "Start a SIP"
+    assert breaker.state == 'closed'
+    assert client.in_flight == 0
+
+
+def test_client_trips_immediately_on_rate_limit(clock, monkeypatch):
+    calls = 0
+
+    async def acreate(**kwargs):
+        nonlocal calls
+        calls += 1
+        raise openai.error.RateLimitError("quota exceeded")
+
+    monkeypatch.setattr(openai.ChatCompletion, 'acreate', acreate)
+    breaker = CircuitBreaker(failure_threshold=5)
+    client = LLMClient('gpt-3.5-turbo', timeout=1, max_concurrency=2, breaker=breaker)
+
+    async def scenario():
+        with pytest.raises(openai.error.RateLimitError):
+            await client.complete([])
+        # Refused without calling out while the circuit is open
+        with pytest.raises(CircuitOpen):
+            await client.complete([])
+
+    asyncio.run(scenario())
+    assert breaker.state == 'open'
+    assert breaker.failures == 1
+    assert calls == 1
+
+
+def test_client_counts_deadline_misses_as_failures(clock, monkeypatch):
+    async def acreate(**kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(openai.ChatCompletion, 'acreate', acreate)
+    breaker = CircuitBreaker(failure_threshold=2)
+    client = LLMClient('gpt-3.5-turbo', timeout=0.01, max_concurrency=2, breaker=breaker)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await client.complete([])
+
+    asyncio.run(scenario())
+    assert breaker.state == 'open'
+    assert client.in_flight == 0
+
+
+def test_client_half_open_lets_one_concurrent_trial_through(clock, monkeypatch):
+    calls = 0
+    release = None
+
+    async def acreate(**kwargs):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return completion("ok")
+
+    monkeypatch.setattr(openai.ChatCompletion, 'acreate', acreate)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure(TimeoutError())
+    clock.now += 60
+    client = LLMClient('gpt-3.5-turbo', timeout=1, max_concurrency=4, breaker=breaker)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        trial = asyncio.create_task(client.complete([]))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpen):
+            await client.complete([])
+        release.set()
+        return await trial
+
+    assert asyncio.run(scenario()) == "ok"
+    assert calls == 1
+    assert breaker.state == 'closed'
+
+
+def test_waiting_for_a_local_slot_never_opens_the_breaker(clock, monkeypatch):
+    calls = 0
+
+    async def acreate(**kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.3)
+        return completion("ok")
+
+    monkeypatch.setattr(openai.ChatCompletion, 'acreate', acreate)
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = LLMClient('gpt-3.5-turbo', timeout=0.5, max_concurrency=2, breaker=breaker)
+
+    async def scenario():
+        return await asyncio.gather(*(client.complete([]) for _ in range(8)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    # Every call that reached the upstream finished inside its own deadline
+    assert results.count("ok") == calls
+    assert all(result == "ok" or isinstance(result, LLMBusy) for result in results)
+    assert any(isinstance(result, LLMBusy) for result in results)
+    assert breaker.state == 'closed'
+    assert breaker.failures == 0
+    assert client.in_flight == 0
+
+
+def test_stream_slot_wait_is_busy_not_a_failure(clock, monkeypatch):
+    async def acreate(**kwargs):
+        async def chunks():
+            # Each gap is inside the deadline, but the whole stream outlasts it
+            for _ in range(5):
+                await asyncio.sleep(0.05)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta={'content': 'ok'})])
+        return chunks()
+
+    monkeypatch.setattr(openai.ChatCompletion, 'acreate', acreate)
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = LLMClient('gpt-3.5-turbo', timeout=0.1, max_concurrency=1, breaker=breaker)
+
+    async def consume():
+        return [text async for text in client.stream([])]
+
+    async def scenario():
+        holder = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        with pytest.raises(LLMBusy):
+            await consume()
+        return await holder
+
+    assert asyncio.run(scenario()) == ['ok'] * 5
+    assert breaker.state == 'closed'
+    assert breaker.failures == 0
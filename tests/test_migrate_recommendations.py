@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from migrate_recommendations import ARCHIVE_COLLECTION, migrate
+
+NOW = datetime(2026, 1, 1)
+
+
+class Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents.sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.documents
+
+
+class Collection:
+    def __init__(self, documents=()):
+        self.documents = {document['_id']: dict(document) for document in documents}
+
+    def find(self, query):
+        return Cursor([dict(self.documents[key]) for key in query['_id']['$in'] if key in self.documents])
+
+    def aggregate(self, pipeline, **kwargs):
+        groups = {}
+        for document in sorted(self.documents.values(), key=lambda document: document['timestamp'], reverse=True):
+            if isinstance(document.get('user_id'), str):
+                groups.setdefault(document['user_id'], []).append(document['_id'])
+
+        async def results():
+            for user_id, ids in groups.items():
+                if len(ids) > 1:
+                    yield {'_id': user_id, 'keep': ids[0], 'ids': ids, 'count': len(ids)}
+        return results()
+
+    async def bulk_write(self, requests):
+        for request in requests:
+            self.documents[request._filter['_id']] = dict(request._doc)
+
+    async def update_one(self, query, update):
+        push = update['$push']['history']
+        history = self.documents[query['_id']].get('history', [])
+        history = push['$each'] + history if push.get('$position') == 0 else history + push['$each']
+        self.documents[query['_id']]['history'] = history[push['$slice']:]
+
+    async def delete_many(self, query):
+        removed = [key for key in query['_id']['$in'] if self.documents.pop(key, None) is not None]
+        return type('DeleteResult', (), {'deleted_count': len(removed)})()
+
+
+class Database(dict):
+    def __missing__(self, name):
+        self[name] = Collection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def recommendation(document_id, user_id, days_ago, **fields):
+    return {'_id': document_id, 'user_id': user_id, 'allocation': {'debt_funds': document_id}, 'timestamp': NOW - timedelta(days=days_ago), **fields}
+
+
+def seeded_database():
+    current = {'allocation': {'debt_funds': 1}, 'risk_category': None, 'profile_hash': 'h1', 'timestamp': NOW}
+    return Database(investment_recommendations=Collection([
+        recommendation(1, 'a', 0, history=[current]),
+        recommendation(2, 'a', 2),
+        recommendation(3, 'a', 1),
+        recommendation(4, 'b', 0),
+        recommendation(5, None, 0),
+        recommendation(6, None, 1),
+    ]))
+
+
+def test_dry_run_changes_nothing():
+    db = seeded_database()
+    asyncio.run(migrate(db, apply=False, history_limit=5))
+    assert sorted(db['investment_recommendations'].documents) == [1, 2, 3, 4, 5, 6]
+    assert db[ARCHIVE_COLLECTION].documents == {}
+
+
+def test_older_documents_are_archived_and_folded_into_the_newest():
+    db = seeded_database()
+    asyncio.run(migrate(db, apply=True, history_limit=5))
+    remaining = db['investment_recommendations'].documents
+    # Anonymous documents aren't covered by the unique index and are left alone
+    assert sorted(remaining) == [1, 4, 5, 6]
+    assert sorted(db[ARCHIVE_COLLECTION].documents) == [2, 3]
+    assert db[ARCHIVE_COLLECTION].documents[2]['allocation'] == {'debt_funds': 2}
+    # Oldest first, ahead of what the kept document already had
+    assert [entry['allocation']['debt_funds'] for entry in remaining[1]['history']] == [2, 3, 1]
+
+
+def test_history_limit_keeps_the_newest_entries_and_rerunning_is_a_no_op():
+    db = seeded_database()
+    asyncio.run(migrate(db, apply=True, history_limit=2))
+    asyncio.run(migrate(db, apply=True, history_limit=2))
+    assert [entry['allocation']['debt_funds'] for entry in db['investment_recommendations'].documents[1]['history']] == [3, 1]
+    assert sorted(db[ARCHIVE_COLLECTION].documents) == [2, 3]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from price_store import PRICE_DTYPE, PriceStore, parse_daily_series, read_price_csv, records_from_rows
+
+
+def bar(date, close):
+    return (date, close - 1, close + 1, close - 2, close, 1000)
+
+
+def test_append_keeps_dates_sorted_and_last_record_per_day(tmp_path):
+    store = PriceStore(str(tmp_path))
+    written = store.append('TCS.BSE', records_from_rows([bar('2024-01-03', 30), bar('2024-01-02', 20), bar('2024-01-03', 31)]))
+    assert written == 2
+    prices = store.read('TCS.BSE')
+    assert prices['date'].astype(str).tolist() == ['2024-01-02', '2024-01-03']
+    assert prices['close'].tolist() == [20, 31]
+
+
+def test_append_only_adds_days_after_the_last_stored_one(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append('TCS.BSE', records_from_rows([bar('2024-01-02', 20), bar('2024-01-03', 30)]))
+    assert store.read('TCS.BSE')['close'].tolist() == [20, 30]
+    written = store.append('TCS.BSE', records_from_rows([bar('2024-01-03', 99), bar('2024-01-04', 40)]))
+    assert written == 1
+    assert store.read('TCS.BSE')['close'].tolist() == [20, 30, 40]
+    assert store.info('TCS.BSE') == {'symbol': 'TCS.BSE', 'rows': 3, 'first_date': '2024-01-02', 'last_date': '2024-01-04'}
+
+
+def test_read_range_is_inclusive(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append('NSEI', records_from_rows([bar(f'2024-01-{day:02d}', day) for day in range(1, 11)]))
+    assert store.read('NSEI', '2024-01-03', '2024-01-05')['close'].tolist() == [3, 4, 5]
+    assert store.read('NSEI', start='2024-01-09')['close'].tolist() == [9, 10]
+    assert len(store.read('NSEI', '2025-01-01')) == 0
+    assert len(store.read('UNKNOWN')) == 0
+
+
+def test_trailing_partial_record_is_ignored(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append('NSEI', records_from_rows([bar('2024-01-02', 20)]))
+    with open(store.path('NSEI'), 'ab') as prices_file:
+        prices_file.write(b'\0' * (PRICE_DTYPE.itemsize // 2))
+    assert store.read('NSEI')['close'].tolist() == [20]
+
+
+def test_invalid_symbols_never_become_paths(tmp_path):
+    with pytest.raises(ValueError):
+        PriceStore(str(tmp_path)).path('../etc/passwd')
+
+
+def test_csv_blank_fields_become_nan(tmp_path):
+    path = tmp_path / 'INFY.BSE.csv'
+    path.write_text("Date,Open,High,Low,Close,Volume\n2024-01-02,1,2,0.5,1.5,\n2024-01-03,1.5,,1,2,100\n")
+    records = read_price_csv(str(path))
+    assert records['close'].tolist() == [1.5, 2]
+    assert np.isnan(records['volume'][0]) and np.isnan(records['high'][1])
+
+
+def test_parse_daily_series_reports_throttling():
+    with pytest.raises(ValueError, match="call frequency"):
+        parse_daily_series({'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute'})
+    records = parse_daily_series({'Time Series (Daily)': {
+        '2024-01-02': {'1. open': '1', '2. high': '2', '3. low': '0.5', '4. close': '1.5', '5. volume': '10'},
+    }})
+    assert records['close'].tolist() == [1.5]
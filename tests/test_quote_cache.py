@@ -0,0 +1,25 @@
+from quote_cache import QuoteCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QuoteCache(ttl=60, max_size=2)
+    cache.set('A', 1)
+    cache.set('B', 2)
+    cache.get('A')
+    cache.set('C', 3)
+    assert cache.peek('B') is None
+    assert cache.peek('A')[0] == 1 and cache.peek('C')[0] == 3
+
+
+def test_pinned_symbols_survive_a_flood_of_other_lookups():
+    cache = QuoteCache(ttl=60, max_size=3, pinned=['NSEI'])
+    cache.pin(['TCS.BSE'])
+    cache.set('NSEI', 18500)
+    cache.set('TCS.BSE', 3500)
+    for index in range(300):
+        cache.set(f'BULK{index}', index)
+    assert cache.peek('NSEI')[0] == 18500
+    assert cache.peek('TCS.BSE')[0] == 3500
+    # Pinned entries don't take up the unpinned capacity
+    assert len(cache) == 5
+    assert [cache.peek(f'BULK{index}') is not None for index in (296, 297, 298, 299)] == [False, True, True, True]
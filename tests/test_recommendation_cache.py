@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from db_indexes import INDEXES
+from recommendation_cache import RecommendationStore, profile_hash
+
+PROFILE = {
+    'age': 30,
+    'monthly_income': 100000,
+    'monthly_expenses': 40000,
+    'emergency_fund': 240000,
+    'investment_experience': 'Beginner',
+    'investment_horizon': 'long',
+    'financial_goals': ['Buy a house', 'retirement'],
+}
+
+
+class RecordingCollection:
+    def __init__(self, stored=None):
+        self.stored = stored
+        self.queries = []
+        self.updates = []
+
+    async def find_one(self, query, **kwargs):
+        self.queries.append(query)
+        return self.stored
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update, upsert))
+
+
+def test_hash_ignores_label_case_goal_order_and_unrelated_fields():
+    reordered = {**PROFILE, 'investment_experience': 'beginner', 'financial_goals': ['Retirement', 'buy  a house'], 'name': 'Asha'}
+    assert profile_hash(PROFILE) == profile_hash(reordered)
+    assert profile_hash(PROFILE) != profile_hash({**PROFILE, 'monthly_income': 100001})
+    assert profile_hash(PROFILE, 'v1') != profile_hash(PROFILE, 'v2')
+
+
+def test_anonymous_lookups_never_reach_the_collection():
+    collection = RecordingCollection(stored={'user_id': None, 'reasoning': "someone else's advice"})
+    store = RecommendationStore(collection)
+    assert asyncio.run(store.get(None, profile_hash(PROFILE))) is None
+    assert asyncio.run(store.get('', profile_hash(PROFILE))) is None
+    assert collection.queries == []
+
+
+def test_anonymous_recommendations_are_not_stored():
+    collection = RecordingCollection()
+    with pytest.raises(ValueError):
+        asyncio.run(RecommendationStore(collection).save({'user_id': None, 'allocation': {}}))
+    assert collection.updates == []
+
+
+def test_save_upserts_the_users_document_and_caps_history():
+    collection = RecordingCollection()
+    asyncio.run(RecommendationStore(collection, history_limit=3).save({'user_id': 'u1', 'allocation': {'debt_funds': 100}, 'profile_hash': 'h'}))
+    [(query, update, upsert)] = collection.updates
+    assert query == {'user_id': 'u1'} and upsert
+    assert update['$push']['history']['$slice'] == -3
+    assert update['$push']['history']['$each'][0]['allocation'] == {'debt_funds': 100}
+
+
+def test_unique_user_index_skips_documents_without_a_user_id():
+    [unique] = [model.document for model in INDEXES['investment_recommendations'] if model.document.get('unique')]
+    assert unique['key'] == {'user_id': 1}
+    assert unique['partialFilterExpression'] == {'user_id': {'$type': 'string'}}
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from risk_scoring import assessment_dicts
+from server import UserProfile, score_risk
+
+
+def profile(index, **fields):
+    values = {
+        'user_id': f'user-{index}',
+        'name': f'User {index}',
+        'age': 30,
+        'monthly_income': 100000,
+        'monthly_expenses': 40000,
+        'current_savings': 0,
+        'dependents': 0,
+        'financial_goals': [],
+        'investment_experience': 'beginner',
+        'risk_preference': 'moderate',
+        'investment_horizon': 'medium',
+        'emergency_fund': 0,
+    }
+    values.update(fields)
+    return UserProfile(**values)
+
+
+def random_profiles(count, seed=7):
+    rng = random.Random(seed)
+    profiles = []
+    for index in range(count):
+        income = rng.choice([0, 25000, 100000, rng.uniform(0, 300000)])
+        expenses = rng.choice([0, income * 0.5, income * 0.7, income * 0.8, income * 0.9, income * 1.2, rng.uniform(0, 200000)])
+        profiles.append(profile(
+            index,
+            age=rng.choice([18, 24, 25, 34, 35, 44, 45, 54, 55, 80, rng.randint(18, 90)]),
+            monthly_income=income,
+            monthly_expenses=expenses,
+            investment_experience=rng.choice(['beginner', 'Intermediate', 'EXPERIENCED', 'expert', '']),
+            investment_horizon=rng.choice(['short', 'Medium', 'LONG', 'forever', '']),
+            emergency_fund=rng.choice([0, expenses, expenses * 3, expenses * 6, expenses * 5.99, rng.uniform(0, 2000000)]),
+        ))
+    return profiles
+
+
+# Every band edge of the questionnaire, hit exactly and from both sides
+EDGE_PROFILES = [
+    *(profile(age, age=age) for age in (24, 25, 34, 35, 44, 45, 54, 55)),
+    # Disposable-income ratios of exactly 0.1, 0.2, 0.3 and 0.5, and a negative one
+    *(profile(100 + spent, monthly_income=100, monthly_expenses=spent) for spent in (90, 80, 70, 50, 120)),
+    # Emergency fund of exactly 1, 3 and 6 months of expenses
+    *(profile(200 + months, emergency_fund=40000 * months) for months in (1, 3, 6)),
+    # No income or no expenses: both ratios fall back to zero
+    profile(300, monthly_income=0, monthly_expenses=0, emergency_fund=500000),
+    profile(301, monthly_income=0, monthly_expenses=20000),
+    # Category edges: totals of 44, 45, 69 and 70
+    profile(400, age=30, monthly_expenses=92000, investment_experience='intermediate', investment_horizon='short', emergency_fund=4 * 92000),
+    profile(401, age=30, monthly_expenses=85000, investment_horizon='long', emergency_fund=0),
+    profile(402, age=22, monthly_expenses=60000, investment_experience='intermediate', investment_horizon='medium', emergency_fund=4 * 60000),
+    profile(403, age=22, monthly_expenses=40000, investment_horizon='medium', emergency_fund=6 * 40000),
+]
+
+
+def single_profile_results(profiles):
+    return [score_risk(item).dict() for item in profiles]
+
+
+def test_edge_profiles_match_the_single_profile_scorer():
+    assert assessment_dicts(EDGE_PROFILES) == single_profile_results(EDGE_PROFILES)
+
+
+def test_edge_profiles_reach_both_sides_of_each_category_boundary():
+    totals = {result['risk_score'] for result in single_profile_results(EDGE_PROFILES)}
+    assert {44, 45, 69, 70} <= totals
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_random_profiles_match_the_single_profile_scorer(seed):
+    profiles = random_profiles(2000, seed)
+    expected = single_profile_results(profiles)
+    actual = assessment_dicts(profiles)
+    mismatches = [(one, other) for one, other in zip(expected, actual) if one != other]
+    assert not mismatches
+    # Same types too, so the JSON the two endpoints produce is identical
+    assert [type(value) for value in actual[0].values()] == [type(value) for value in expected[0].values()]
+
+
+def test_optional_user_id_may_be_missing_in_a_batch():
+    anonymous = profile(0)
+    anonymous.user_id = None
+    assert assessment_dicts([anonymous])[0]['user_id'] is None
+
+
+def test_empty_batch():
+    assert assessment_dicts([]) == []
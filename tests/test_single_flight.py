@@ -0,0 +1,83 @@
+import asyncio
+
+from quote_cache import SingleFlight
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {'price': 101.5}
+
+        waiters = [asyncio.create_task(flights.do('RELIANCE.BSE', fetch)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return calls, results, flights
+
+    calls, results, flights = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [{'price': 101.5}] * 10
+    assert flights.stats() == {'in_flight': 0, 'started': 1, 'coalesced': 9}
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0)
+            raise ConnectionError("upstream down")
+
+        return await asyncio.gather(*(flights.do('TCS.BSE', fetch) for _ in range(3)), return_exceptions=True), flights
+
+    results, flights = asyncio.run(scenario())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert len(flights) == 0
+
+
+def test_cancelling_one_waiter_leaves_the_others_running():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return 42
+
+        cancelled = asyncio.create_task(flights.do('INFY.BSE', fetch))
+        others = [asyncio.create_task(flights.do('INFY.BSE', fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return calls, cancelled, await asyncio.gather(*others)
+
+    calls, cancelled, results = asyncio.run(scenario())
+    assert cancelled.cancelled()
+    assert calls == 1
+    assert results == [42, 42, 42]
+
+
+def test_new_call_starts_after_the_previous_one_finished():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        return [await flights.do('HDFCBANK.BSE', fetch), await flights.do('HDFCBANK.BSE', fetch)]
+
+    assert asyncio.run(scenario()) == [1, 2]
@@ -0,0 +1,64 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from stress import HISTOGRAM_EDGES, PRESET_SCENARIOS, STRESS_BUCKETS, allocation_matrix, run_stress_test, shock_vector
+
+
+class AsyncCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+def random_allocations(count, seed=3):
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(len(STRESS_BUCKETS)), size=count) * 100
+    return [dict(zip(STRESS_BUCKETS, row.tolist())) for row in weights]
+
+
+def test_rate_rise_costs_duration_times_the_move():
+    shocks = dict(zip(STRESS_BUCKETS, shock_vector({'shocks': {'equity_mid_cap': -0.3}, 'rate_change_bps': 100})))
+    assert shocks['equity_mid_cap'] == pytest.approx(-0.3)
+    assert shocks['debt_funds'] == pytest.approx(-0.03)
+    assert shocks['emergency_buffer'] == pytest.approx(-0.0025)
+
+
+def test_allocations_are_normalized_and_empty_ones_dropped():
+    weights = allocation_matrix([{'equity_large_cap': 30, 'debt_funds': 10, 'crypto': 60}, {}, None, {'debt_funds': 0}])
+    assert weights.shape == (1, len(STRESS_BUCKETS))
+    assert weights[0, STRESS_BUCKETS.index('equity_large_cap')] == pytest.approx(0.75)
+
+
+@pytest.mark.parametrize('chunk_size', [7, 1000, 5000])
+def test_chunked_results_match_a_direct_computation(chunk_size):
+    allocations = random_allocations(3000)
+    documents = [{'allocation': allocation} for allocation in allocations]
+    result = asyncio.run(run_stress_test(AsyncCursor(documents), PRESET_SCENARIOS, chunk_size=chunk_size))
+
+    returns = allocation_matrix(allocations) @ np.array([shock_vector(scenario) for scenario in PRESET_SCENARIOS.values()]).T
+    assert result['users'] == 3000
+    for column, name in enumerate(PRESET_SCENARIOS):
+        losses = -returns[:, column]
+        summary = result['results'][name]
+        assert summary['mean_loss'] == pytest.approx(losses.mean(), abs=1e-6)
+        assert summary['worst_loss'] == pytest.approx(losses.max(), abs=1e-6)
+        assert summary['users_losing_over'] == {
+            f'{int(threshold * 100)}%': int((losses >= threshold).sum()) for threshold in (0.1, 0.2, 0.3)
+        }
+        # Percentiles are exact to one histogram bin
+        bin_width = HISTOGRAM_EDGES[1] - HISTOGRAM_EDGES[0]
+        assert summary['p95_loss'] == pytest.approx(np.percentile(losses, 95), abs=bin_width + 1e-9)
+
+
+def test_empty_cursor_reports_no_users():
+    result = asyncio.run(run_stress_test(AsyncCursor([]), PRESET_SCENARIOS))
+    assert result['users'] == 0
+    assert all(summary == {'users': 0} for summary in result['results'].values())
@@ -0,0 +1,143 @@
+import asyncio
+
+from write_behind import WriteBehindQueue
+
+
+class RecordingCollection:
+    def __init__(self, gate=None):
+        self.batches = []
+        self.single = []
+        self.gate = gate
+
+    async def insert_many(self, documents, ordered=True):
+        if self.gate is not None:
+            await self.gate.wait()
+        self.batches.append(list(documents))
+
+    async def insert_one(self, document):
+        self.single.append(document)
+
+
+class RecordingDatabase(dict):
+    def __init__(self, gate=None):
+        super().__init__()
+        self.gate = gate
+
+    def __missing__(self, name):
+        self[name] = RecordingCollection(self.gate)
+        return self[name]
+
+
+def test_flushes_as_soon_as_a_batch_is_full():
+    async def scenario():
+        db = RecordingDatabase()
+        queue = WriteBehindQueue(db, max_batch=3, flush_interval=60)
+        queue.start()
+        for index in range(3):
+            await queue.put('chat_history', {'n': index})
+        await asyncio.sleep(0.05)
+        batches = list(db['chat_history'].batches)
+        await queue.close()
+        return batches
+
+    assert asyncio.run(scenario()) == [[{'n': 0}, {'n': 1}, {'n': 2}]]
+
+
+def test_flushes_a_partial_batch_after_the_interval():
+    async def scenario():
+        db = RecordingDatabase()
+        queue = WriteBehindQueue(db, max_batch=100, flush_interval=0.05)
+        queue.start()
+        await queue.put('chat_history', {'n': 0})
+        await queue.put('chat_history', {'n': 1})
+        await asyncio.sleep(0.01)
+        early = list(db['chat_history'].batches)
+        await asyncio.sleep(0.1)
+        late = list(db['chat_history'].batches)
+        await queue.close()
+        return early, late
+
+    early, late = asyncio.run(scenario())
+    assert early == []
+    assert late == [[{'n': 0}, {'n': 1}]]
+
+
+def test_close_drains_everything_queued():
+    async def scenario():
+        db = RecordingDatabase()
+        queue = WriteBehindQueue(db, max_batch=7, flush_interval=60)
+        queue.start()
+        for index in range(50):
+            await queue.put('chat_history' if index % 2 else 'audit', {'n': index})
+        await queue.close()
+        # Later puts write straight through
+        await queue.put('chat_history', {'n': 50})
+        return db, queue.stats()
+
+    db, stats = asyncio.run(scenario())
+    written = [document['n'] for name in ('chat_history', 'audit') for batch in db[name].batches for document in batch]
+    assert sorted(written) == list(range(50))
+    assert all(len(batch) <= 7 for name in ('chat_history', 'audit') for batch in db[name].batches)
+    assert db['chat_history'].single == [{'n': 50}]
+    assert stats['written'] == 50
+    assert stats['depth'] == 0
+
+
+def test_put_waits_when_the_queue_is_full():
+    async def scenario():
+        gate = asyncio.Event()
+        db = RecordingDatabase(gate)
+        queue = WriteBehindQueue(db, max_batch=1, flush_interval=60, max_pending=2)
+        queue.start()
+        # The first document is taken by the flusher, which then blocks on the gate
+        await queue.put('chat_history', {'n': 0})
+        await asyncio.sleep(0.01)
+        await queue.put('chat_history', {'n': 1})
+        await queue.put('chat_history', {'n': 2})
+        blocked = asyncio.create_task(queue.put('chat_history', {'n': 3}))
+        await asyncio.sleep(0.01)
+        was_blocked = not blocked.done()
+        gate.set()
+        await asyncio.wait_for(blocked, timeout=1)
+        await queue.close()
+        return was_blocked, db, queue.stats()
+
+    was_blocked, db, stats = asyncio.run(scenario())
+    assert was_blocked
+    assert stats['backpressure_waits'] == 1
+    assert [batch[0]['n'] for batch in db['chat_history'].batches] == [0, 1, 2, 3]
+
+
+def test_writes_through_when_not_started():
+    async def scenario():
+        db = RecordingDatabase()
+        await WriteBehindQueue(db).put('chat_history', {'n': 0})
+        return db
+
+    db = asyncio.run(scenario())
+    assert db['chat_history'].single == [{'n': 0}]
+    assert db['chat_history'].batches == []
+
+
+def test_puts_blocked_on_a_full_queue_are_not_lost_on_close():
+    async def scenario():
+        gate = asyncio.Event()
+        db = RecordingDatabase(gate)
+        queue = WriteBehindQueue(db, max_batch=1, flush_interval=60, max_pending=1)
+        queue.start()
+        await queue.put('chat_history', {'n': 0})
+        await asyncio.sleep(0.01)  # The flusher holds n=0 and waits on the gate
+        await queue.put('chat_history', {'n': 1})  # Fills the queue
+        blocked = [asyncio.create_task(queue.put('chat_history', {'n': n})) for n in (2, 3)]
+        await asyncio.sleep(0.01)
+        # Close in the same tick the flusher frees a slot, ahead of the woken putters
+        gate.set()
+        closing = asyncio.create_task(queue.close())
+        await asyncio.wait_for(asyncio.gather(closing, *blocked), timeout=1)
+        return db, queue.stats()
+
+    db, stats = asyncio.run(scenario())
+    written = sorted(document['n'] for batch in db['chat_history'].batches for document in batch)
+    written += [document['n'] for document in db['chat_history'].single]
+    assert sorted(written) == [0, 1, 2, 3]
+    assert stats['depth'] == 0